@@ -0,0 +1,104 @@
+"""
+Startup benchmark for the TimeSync CLI.
+
+Launches src/timesync.py repeatedly, measures the time until the first ">> " prompt is printed, and fails if the
+median time-to-first-prompt exceeds the budget. It also fails if a module that should only be imported on first use
+is loaded before the first prompt.
+
+Usage:
+    python benchmarks/startup.py [--runs 20] [--budget-ms 100]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Directory of the TimeSync sources.
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+
+# Modules that must not be imported before the first prompt.
+LAZY_MODULES = ("dashboard", "export", "external", "shared", "stream", "watch", "json", "tempfile", "multiprocessing",
+                "fnmatch")
+
+
+def time_to_first_prompt(python: str) -> float:
+    """ Launch TimeSync once and measure the time until the first prompt is printed.
+
+    Args:
+        python (str): path of the Python interpreter.
+
+    Returns:
+        the time to the first prompt in seconds.
+    """
+
+    started = time.perf_counter()
+    process = subprocess.Popen([python, "timesync.py"], cwd=SOURCE_DIR, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    # Read the output as it is written until the prompt appears.
+    output = b""
+    while not output.endswith(b">> "):
+        chunk = os.read(process.stdout.fileno(), 65536)
+        if not chunk:
+            raise RuntimeError("TimeSync exited before printing the first prompt.")
+        output += chunk
+
+    elapsed = time.perf_counter() - started
+
+    process.communicate(b"exit\n")
+
+    return elapsed
+
+
+def loaded_lazy_modules(python: str) -> list:
+    """ Find the lazily imported modules that are loaded by importing TimeSync.
+
+    Args:
+        python (str): path of the Python interpreter.
+
+    Returns:
+        the names of the loaded modules that should only be imported on first use.
+    """
+
+    code = f"import sys, timesync; print(' '.join(name for name in {LAZY_MODULES!r} if name in sys.modules))"
+    result = subprocess.run([python, "-c", code], cwd=SOURCE_DIR, capture_output=True, text=True, check=True)
+
+    return result.stdout.split()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure the time-to-first-prompt of the TimeSync CLI.")
+    parser.add_argument("--runs", type=int, default=20, help="number of launches to measure.")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="maximum median time-to-first-prompt.")
+    parser.add_argument("--python", default=sys.executable, help="Python interpreter used to launch TimeSync.")
+    arguments = parser.parse_args()
+
+    # Warm up, so that the bytecode caches are written before measuring.
+    time_to_first_prompt(arguments.python)
+
+    timings = [time_to_first_prompt(arguments.python) * 1000 for _ in range(arguments.runs)]
+    median = statistics.median(timings)
+
+    print(f"time-to-first-prompt over {arguments.runs} runs: "
+          f"min {min(timings):.1f} ms, median {median:.1f} ms, max {max(timings):.1f} ms "
+          f"(budget {arguments.budget_ms:.0f} ms)")
+
+    failed = False
+
+    if median > arguments.budget_ms:
+        print(f"FAIL: median time-to-first-prompt exceeds the budget by {median - arguments.budget_ms:.1f} ms.")
+        failed = True
+
+    lazy_modules = loaded_lazy_modules(arguments.python)
+    if lazy_modules:
+        print(f"FAIL: modules loaded before the first prompt: {', '.join(lazy_modules)}.")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
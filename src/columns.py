@@ -0,0 +1,111 @@
+from array import array
+
+from timeframe import TimeFrame
+
+
+class SessionColumns:
+    """
+    Columns of the IDs, UTC offsets and normalized start/end times of the stored timeframes, in the order of TIMEFRAMES.
+
+    The columns are kept in step with the store, so exports can hand the arrays to Arrow as buffers instead of building
+    them per row. A replaced timeframe is overwritten in its row. A removed timeframe leaves an empty row behind, which
+    is dropped when the columns are compacted, so a removal costs O(1).
+    """
+
+    def __init__(self) -> None:
+        self.ids = []
+        self.utc_offsets = array("h")
+        self.norm_starts = array("q")
+        self.norm_ends = array("q")
+
+        # Row of each stored timeframe ID. Stored as {timeframe_id: row}
+        self.rows = {}
+
+        # Rows of removed timeframes that are not compacted yet.
+        self.removed_rows = []
+
+    def set(self, timeframe_id: str, timeframe: TimeFrame) -> None:
+        """ Add a timeframe, or overwrite the row of the timeframe with the same ID.
+
+        Args:
+            timeframe_id (str): ID of the timeframe.
+            timeframe (TimeFrame): the timeframe.
+        """
+
+        row = self.rows.get(timeframe_id)
+
+        if row is None:
+            self.rows[timeframe_id] = len(self.ids)
+            self.ids.append(timeframe_id)
+            self.utc_offsets.append(timeframe.offset_minutes)
+            self.norm_starts.append(timeframe.norm_start_epoch)
+            self.norm_ends.append(timeframe.norm_end_epoch)
+        else:
+            self.utc_offsets[row] = timeframe.offset_minutes
+            self.norm_starts[row] = timeframe.norm_start_epoch
+            self.norm_ends[row] = timeframe.norm_end_epoch
+
+    def remove(self, timeframe_id: str) -> None:
+        """ Remove a timeframe. Its row is dropped lazily.
+
+        Args:
+            timeframe_id (str): ID of a stored timeframe.
+        """
+
+        row = self.rows.pop(timeframe_id)
+        self.ids[row] = None
+        self.removed_rows.append(row)
+
+        # Compact once empty rows outnumber the live ones, to bound memory.
+        if len(self.removed_rows) > len(self.rows) + 64:
+            self.compact()
+
+    def clear(self) -> None:
+        """ Remove all timeframes. """
+
+        self.ids.clear()
+        del self.utc_offsets[:], self.norm_starts[:], self.norm_ends[:]
+        self.rows.clear()
+        self.removed_rows.clear()
+
+    def compact(self) -> None:
+        """ Drop the rows of removed timeframes, copying the runs of live rows between them as slices. """
+
+        if not self.removed_rows:
+            return
+
+        # Runs of live rows between the removed rows.
+        removed_rows = sorted(self.removed_rows)
+        runs = [
+            (start + 1, end)
+            for start, end in zip([-1] + removed_rows, removed_rows + [len(self.ids)])
+            if end > start + 1
+        ]
+
+        ids, utc_offsets, norm_starts, norm_ends = [], array("h"), array("q"), array("q")
+        for start, end in runs:
+            ids += self.ids[start:end]
+            utc_offsets += self.utc_offsets[start:end]
+            norm_starts += self.norm_starts[start:end]
+            norm_ends += self.norm_ends[start:end]
+
+        self.ids, self.utc_offsets, self.norm_starts, self.norm_ends = ids, utc_offsets, norm_starts, norm_ends
+        self.rows = dict(zip(ids, range(len(ids))))
+        self.removed_rows.clear()
+
+    def columns(self) -> dict:
+        """ Get the columns of the stored timeframes, compacting them first.
+
+        Returns:
+            a dict of columns in the format of export.build_columns(). The arrays are not copied and must not be
+            modified.
+        """
+
+        self.compact()
+
+        return {
+            "timeframe_id": self.ids,
+            "utc_offset": self.utc_offsets,
+            "norm_start": self.norm_starts,
+            "norm_end": self.norm_ends,
+        }
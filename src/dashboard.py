@@ -0,0 +1,249 @@
+import os
+import select
+import shutil
+import sys
+import time
+from typing import Callable, TextIO
+
+# ANSI escape sequences to switch to/from the alternate screen buffer, clear the screen, clear the rest of a line, and
+# reset the scroll region to the whole screen.
+CLEAR_SCREEN_SEQUENCE = "\033[2J"
+ENTER_SCREEN_SEQUENCE = "\033[?1049h" + CLEAR_SCREEN_SEQUENCE
+LEAVE_SCREEN_SEQUENCE = "\033[?1049l"
+CLEAR_LINE_SEQUENCE = "\033[K"
+RESET_SCROLL_REGION_SEQUENCE = "\033[r"
+
+# Prompt shown on the last line of the screen.
+PROMPT = ">> "
+
+
+def move_cursor(row: int, column: int = 1) -> str:
+    """ Build the ANSI escape sequence to move the cursor.
+
+    Args:
+        row (int): the row, starting at 1.
+        column (int): the column, starting at 1.
+
+    Returns:
+        the escape sequence.
+    """
+
+    return f"\033[{row};{column}H"
+
+
+def set_scroll_region(top: int, bottom: int) -> str:
+    """ Build the ANSI escape sequence to limit scrolling to a range of rows. Rows outside of it never move.
+
+    Args:
+        top (int): the first row of the region, starting at 1.
+        bottom (int): the last row of the region.
+
+    Returns:
+        the escape sequence.
+    """
+
+    return f"\033[{top};{bottom}r"
+
+
+def fit_panes(panes: list, width: int, height: int) -> list:
+    """ Lay out panes of text on the screen, one below the other.
+
+    Each pane gets an equal share of the height. Longer panes are cut off with a line counting the hidden lines, and
+    lines longer than the width are cut off, so that every line takes exactly one row of the screen.
+
+    Args:
+        panes (list): the panes, as (title, text) tuples.
+        width (int): number of columns of the screen.
+        height (int): number of rows available for the panes.
+
+    Returns:
+        the lines of the screen.
+    """
+
+    lines = []
+
+    if not panes:
+        return lines
+
+    # Number of rows of each pane, including its title.
+    pane_height = max(2, height // len(panes))
+
+    for title, text in panes:
+        pane_lines = [f"[ {title} ]"] + text.strip("\n").split("\n")
+
+        if len(pane_lines) > pane_height:
+            hidden = len(pane_lines) - pane_height + 1
+            pane_lines = pane_lines[:pane_height - 1] + [f"... {hidden} more line(s)"]
+
+        lines.extend(line[:width] for line in pane_lines)
+
+        # Leave a blank row between panes.
+        if len(lines) < height:
+            lines.append("")
+
+    return lines[:height]
+
+
+class Screen:
+    """
+    Full-screen terminal view that redraws only the rows that changed since the last frame, at most fps times a second.
+
+    The terminal echoes the commands typed at the prompt, including the newline of Enter. Scrolling is limited to the
+    prompt row, so that newline only clears the prompt row instead of scrolling the whole screen up.
+    """
+
+    def __init__(self, fps: float = 20, stream: TextIO = None) -> None:
+        # Stream the frames are written to.
+        self.stream = stream if stream is not None else sys.stdout
+
+        # Minimum number of seconds between two frames, and the time the last frame was drawn.
+        self.frame_interval = 1 / fps
+        self.last_draw = 0.0
+
+        # Rows currently on the screen, and the (columns, rows) size of the screen they were drawn for.
+        self.rows = []
+        self.drawn_size = None
+
+    def size(self) -> tuple:
+        """ Get the size of the terminal.
+
+        Returns:
+            a tuple (columns, rows).
+        """
+
+        return shutil.get_terminal_size()
+
+    def due_in(self) -> float:
+        """ Get the number of seconds until the next frame may be drawn.
+
+        Returns:
+            the seconds to wait, 0 if a frame may be drawn now.
+        """
+
+        return max(0.0, self.last_draw + self.frame_interval - time.monotonic())
+
+    def enter(self) -> None:
+        """ Switch to the alternate screen buffer. The previous contents of the terminal are restored on leave(). """
+
+        self.stream.write(ENTER_SCREEN_SEQUENCE)
+        self.stream.flush()
+        self.rows = []
+        self.drawn_size = None
+
+    def leave(self) -> None:
+        """ Switch back to the normal screen buffer. """
+
+        self.stream.write(RESET_SCROLL_REGION_SEQUENCE + LEAVE_SCREEN_SEQUENCE)
+        self.stream.flush()
+
+    def line_entered(self) -> None:
+        """ Record that a line was entered at the prompt. Its echoed newline scrolled the prompt row, leaving it blank,
+        so the prompt is drawn again with the next frame. """
+
+        if self.rows:
+            self.rows[-1] = ""
+
+    def draw(self, rows: list, status: str = "") -> None:
+        """ Draw a frame, rewriting only the rows that changed.
+
+        Args:
+            rows (list): the rows of the frame, excluding the status line and the prompt.
+            status (str): text of the status line, shown above the prompt.
+        """
+
+        columns, height = self.size()
+
+        updates = []
+
+        # First frame, or the terminal was resized: limit scrolling to the prompt row and redraw every row.
+        if (columns, height) != self.drawn_size:
+            updates.append(CLEAR_SCREEN_SEQUENCE + set_scroll_region(height, height))
+            self.rows = []
+            self.drawn_size = (columns, height)
+
+        # Fill the screen: the frame rows, then the status line and the prompt on the last two rows.
+        rows = rows[:height - 2]
+        rows = rows + [""] * (height - 2 - len(rows)) + [status[:columns], PROMPT]
+
+        # Rewrite the changed rows. Rows that are no longer part of the frame are cleared.
+        for index in range(max(len(rows), len(self.rows))):
+            row = rows[index] if index < len(rows) else ""
+            if index >= len(self.rows) or self.rows[index] != row:
+                updates.append(f"{move_cursor(index + 1)}{row}{CLEAR_LINE_SEQUENCE}")
+
+        # Leave the cursor after the prompt.
+        updates.append(move_cursor(height, len(PROMPT) + 1))
+
+        self.stream.write("".join(updates))
+        self.stream.flush()
+
+        self.rows = rows
+        self.last_draw = time.monotonic()
+
+
+class LineReader:
+    """
+    Reads lines from a file descriptor, with an optional timeout.
+
+    Lines are read directly from the file descriptor, so lines that arrive together, e.g. a pasted burst of commands,
+    stay in this reader's buffer rather than in a hidden stdin buffer.
+    """
+
+    def __init__(self, fd: int) -> None:
+        self.fd = fd
+
+        # Data read but not yet returned as lines.
+        self.buffer = b""
+        self.at_eof = False
+
+    def readline(self, timeout: float = None) -> str | None:
+        """ Read the next line.
+
+        Args:
+            timeout (float): seconds to wait for a line. Waits indefinitely if None.
+
+        Returns:
+            the line including its newline character, "" at the end of the input, or None if the timeout expired.
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while b"\n" not in self.buffer and not self.at_eof:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+
+            # Wait until input is available.
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if not readable:
+                return None
+
+            data = os.read(self.fd, 65536)
+            if data:
+                self.buffer += data
+            else:
+                self.at_eof = True
+
+        # Return the next complete line, or the rest of the input at the end.
+        index = self.buffer.find(b"\n")
+        if index == -1:
+            line, self.buffer = self.buffer, b""
+        else:
+            line, self.buffer = self.buffer[:index + 1], self.buffer[index + 1:]
+
+        return line.decode(errors="replace")
+
+
+class PromptingReader:
+    """
+    Stand-in for sys.stdin while a command runs on the live screen, so that its input() confirmations are shown.
+    """
+
+    def __init__(self, read_line: Callable[[], str], before_read: Callable[[], None]) -> None:
+        # Reads the next line of input.
+        self.read_line = read_line
+
+        # Called before every read, e.g. to show the confirmation question on the status line.
+        self.before_read = before_read
+
+    def readline(self, *_) -> str:
+        self.before_read()
+        return self.read_line()
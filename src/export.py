@@ -0,0 +1,385 @@
+import json
+from array import array
+from datetime import datetime, timedelta
+from typing import Iterable, Tuple
+
+from timeframe import DATETIME_FORMAT, EPOCH, TimeFrame
+from utils import format_utc_offset, is_valid_datetime, is_valid_offset
+
+# Supported export formats.
+EXPORT_FORMATS = ("json", "jsonl", "arrow")
+
+
+def build_columns(timeframes: dict) -> dict:
+    """ Build the columnar representation of the timeframes.
+
+    Args:
+        timeframes (dict): timeframes to include in the columns.
+
+    Returns:
+        a dict of columns: "timeframe_id" (list of str), "utc_offset" (array of offset minutes), and "norm_start" /
+        "norm_end" (arrays of normalized times in seconds since the epoch).
+    """
+
+    values = timeframes.values()
+
+    # Fill the arrays from generators, so no intermediate lists are created.
+    return {
+        "timeframe_id": list(timeframes.keys()),
+        "utc_offset": array("h", (timeframe.offset_minutes for timeframe in values)),
+        "norm_start": array("q", (timeframe.norm_start_epoch for timeframe in values)),
+        "norm_end": array("q", (timeframe.norm_end_epoch for timeframe in values)),
+    }
+
+
+def timeframe_records(timeframes: dict) -> list:
+    """ Build the records of the 'list' output.
+
+    Args:
+        timeframes (dict): timeframes to include in the records.
+
+    Returns:
+        a list of dicts, one per timeframe.
+    """
+
+    records = []
+
+    for timeframe_id, timeframe in timeframes.items():
+        # Reuse the formatted attributes of the timeframe.
+        utc_offset, start_time, end_time, norm_start_time, norm_end_time = timeframe.get_attributes()
+
+        records.append({
+            "timeframe_id": timeframe_id,
+            "utc_offset": utc_offset,
+            "start_time": start_time,
+            "end_time": end_time,
+            "norm_start_time": norm_start_time,
+            "norm_end_time": norm_end_time,
+        })
+
+    return records
+
+
+def localized_records(timeframes: dict, localized_times: dict) -> list:
+    """ Build the records of the localized times in the 'find' output.
+
+    Args:
+        timeframes (dict): timeframes to include in the records.
+        localized_times (dict): localized times of each UTC offset, stored as {utc_offset: [start, end]}.
+
+    Returns:
+        a list of dicts, one per timeframe.
+    """
+
+    records = []
+
+    for timeframe_id, timeframe in timeframes.items():
+        utc_offset = timeframe.get_utc_offset()
+
+        # Localized times are shared by all timeframes with the same UTC offset.
+        start_time, end_time = localized_times[utc_offset]
+
+        records.append({
+            "timeframe_id": timeframe_id,
+            "utc_offset": utc_offset,
+            "start_time": start_time,
+            "end_time": end_time,
+        })
+
+    return records
+
+
+def visualization_records(timeframes: dict, weight: int, earliest_start_time: datetime) -> list:
+    """ Build the records of the 'vis' output.
+
+    Args:
+        timeframes (dict): timeframes to include in the records.
+        weight (int): number of minutes represented by one character.
+        earliest_start_time (datetime): earliest normalized start time among the timeframes.
+
+    Returns:
+        a list of dicts, one per timeframe.
+    """
+
+    return [
+        {"timeframe_id": timeframe_id, "representation": timeframe.to_vis_string(weight, earliest_start_time)}
+        for timeframe_id, timeframe in timeframes.items()
+    ]
+
+
+def serialize_records(records: Iterable[dict], metadata: dict, export_format: str) -> str:
+    """ Serialize records as JSON or JSON Lines.
+
+    JSON output is a single object containing the metadata and a "timeframes" list of records.
+    JSON Lines output contains one record per line, each including the metadata.
+
+    Args:
+        records (Iterable[dict]): records to serialize.
+        metadata (dict): values describing the whole result.
+        export_format (str): "json" or "jsonl".
+
+    Returns:
+        the serialized records as a string.
+    """
+
+    if export_format == "json":
+        return json.dumps({**metadata, "timeframes": list(records)}, indent=2)
+
+    elif export_format == "jsonl":
+        return "".join(json.dumps({**metadata, **record}) + "\n" for record in records)
+
+    else:
+        raise ValueError(f"unsupported format \"{export_format}\". Expected one of: json, jsonl.")
+
+
+def write_arrow(columns: dict, metadata: dict, path: str = None, localize: Tuple[int, int] = None) -> bytes | None:
+    """ Write the columns as an Arrow IPC file.
+
+    The offset and normalized time arrays are handed to Arrow as buffers, so no per-row Python objects are created.
+
+    Args:
+        columns (dict): columns built by build_columns(), or the session's maintained columns.
+        metadata (dict): values describing the whole result, stored as schema metadata.
+        path (str): path of the output file. If None, the file contents are returned instead.
+        localize (tuple): if provided, normalized (start, end) times in seconds since the epoch that are localized to
+                          every UTC offset. Adds "local_start" and "local_end" columns to the output.
+
+    Returns:
+        the Arrow IPC file as bytes if no path was provided, else None.
+    """
+
+    # pyarrow is an optional dependency, only required for Arrow exports.
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        raise ImportError("Arrow export requires the \"pyarrow\" package.") from None
+
+    length = len(columns["timeframe_id"])
+
+    # Wrap the arrays' memory as Arrow buffers without copying.
+    offsets = pa.Array.from_buffers(pa.int16(), length, [None, pa.py_buffer(columns["utc_offset"])])
+    norm_start = pa.Array.from_buffers(pa.int64(), length, [None, pa.py_buffer(columns["norm_start"])])
+    norm_end = pa.Array.from_buffers(pa.int64(), length, [None, pa.py_buffer(columns["norm_end"])])
+
+    arrays = {
+        "timeframe_id": pa.array(columns["timeframe_id"], pa.string()),
+        "utc_offset_minutes": offsets,
+        "norm_start": norm_start.view(pa.timestamp("s")),
+        "norm_end": norm_end.view(pa.timestamp("s")),
+    }
+
+    # Localize the common timeframe to each UTC offset with vectorized arithmetic.
+    if localize is not None:
+        offset_seconds = pc.multiply(offsets.cast(pa.int64()), 60)
+        local_start = pc.add(offset_seconds, localize[0])
+        local_end = pc.add(offset_seconds, localize[1])
+        arrays["local_start"] = local_start.cast(pa.timestamp("s"))
+        arrays["local_end"] = local_end.cast(pa.timestamp("s"))
+
+    table = pa.table(arrays, metadata={key: json.dumps(value) for key, value in metadata.items()})
+
+    # Write to the output file, or to an in-memory buffer if no path was provided.
+    sink = pa.OSFile(path, "wb") if path is not None else pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    if path is not None:
+        sink.close()
+        return None
+
+    return sink.getvalue().to_pybytes()
+
+
+def common_timeframe_metadata(common_timeframe: Tuple[datetime, datetime] | None) -> dict:
+    """ Build the metadata of the 'find' output.
+
+    Args:
+        common_timeframe (tuple): the normalized (start, end) times of the common timeframe, or None.
+
+    Returns:
+        a dict containing the common timeframe's start/end times in UTC and its duration in minutes.
+    """
+
+    if common_timeframe is None:
+        return {"start_time": None, "end_time": None, "duration_minutes": None}
+
+    start_time, end_time = common_timeframe
+
+    return {
+        "start_time": start_time.strftime(DATETIME_FORMAT),
+        "end_time": end_time.strftime(DATETIME_FORMAT),
+        "duration_minutes": (end_time - start_time) // timedelta(minutes=1),
+    }
+
+
+def export_timeframes(timeframes: dict, export_format: str, path: str = None,
+                      columns: dict = None) -> str | bytes | None:
+    """ Export the timeframes, as listed by the 'list' action.
+
+    Args:
+        timeframes (dict): timeframes to export.
+        export_format (str): "json", "jsonl" or "arrow".
+        path (str): path of the output file. If None, the output is returned instead.
+        columns (dict): columns of the timeframes, if they are maintained by the caller. Built if not provided.
+
+    Returns:
+        the exported output if no path was provided, else None.
+    """
+
+    if export_format == "arrow":
+        return write_arrow(columns if columns is not None else build_columns(timeframes), {}, path)
+
+    return write_text_output(serialize_records(timeframe_records(timeframes), {}, export_format), path)
+
+
+def export_common_timeframe(timeframes: dict, common_timeframe: Tuple[datetime, datetime] | None,
+                            localized_times: dict, export_format: str, path: str = None,
+                            columns: dict = None) -> str | bytes | None:
+    """ Export the common timeframe and its localized times, as printed by the 'find' action.
+
+    Args:
+        timeframes (dict): timeframes to export.
+        common_timeframe (tuple): the normalized (start, end) times of the common timeframe, or None.
+        localized_times (dict): localized times of each UTC offset, stored as {utc_offset: [start, end]}.
+        export_format (str): "json", "jsonl" or "arrow".
+        path (str): path of the output file. If None, the output is returned instead.
+        columns (dict): columns of the timeframes, if they are maintained by the caller. Built if not provided.
+
+    Returns:
+        the exported output if no path was provided, else None.
+    """
+
+    metadata = common_timeframe_metadata(common_timeframe)
+
+    if export_format == "arrow":
+        localize = None
+        if common_timeframe is not None:
+            localize = tuple((time - EPOCH) // timedelta(seconds=1) for time in common_timeframe)
+        columns = columns if columns is not None else build_columns(timeframes)
+        return write_arrow(columns, metadata, path, localize=localize)
+
+    records = localized_records(timeframes, localized_times) if common_timeframe is not None else []
+
+    return write_text_output(serialize_records(records, metadata, export_format), path)
+
+
+def export_visualization(timeframes: dict, weight: int, earliest_start_time: datetime, export_format: str,
+                         path: str = None, columns: dict = None) -> str | bytes | None:
+    """ Export the visualization of the timeframes, as printed by the 'vis' action.
+
+    Args:
+        timeframes (dict): timeframes to export.
+        weight (int): number of minutes represented by one character.
+        earliest_start_time (datetime): earliest normalized start time among the timeframes.
+        export_format (str): "json", "jsonl" or "arrow".
+        path (str): path of the output file. If None, the output is returned instead.
+        columns (dict): columns of the timeframes, if they are maintained by the caller. Built if not provided.
+
+    Returns:
+        the exported output if no path was provided, else None.
+    """
+
+    metadata = {"weight_minutes": weight, "earliest_start_time": earliest_start_time.strftime(DATETIME_FORMAT)}
+
+    # The Arrow output carries the normalized times, from which the representation can be derived.
+    if export_format == "arrow":
+        return write_arrow(columns if columns is not None else build_columns(timeframes), metadata, path)
+
+    records = visualization_records(timeframes, weight, earliest_start_time)
+
+    return write_text_output(serialize_records(records, metadata, export_format), path)
+
+
+def read_timeframes(path: str) -> dict:
+    """ Read the timeframes of a JSON or JSON Lines file exported by export_timeframes().
+
+    Args:
+        path (str): path of the file.
+
+    Returns:
+        a dict of the timeframes, stored as {timeframe_id: TimeFrame_object}.
+
+    Raises:
+        ValueError: if a record is invalid or an ID appears more than once.
+    """
+
+    with open(path, "r") as file:
+        content = file.read()
+
+    # A JSON export is a single object with a "timeframes" list. A JSON Lines export has one record per line.
+    try:
+        document = json.loads(content)
+        records = document["timeframes"] if isinstance(document, dict) and "timeframes" in document else [document]
+    except json.JSONDecodeError:
+        records = [json.loads(line) for line in content.splitlines() if line.strip()]
+
+    timeframes = {}
+
+    for position, record in enumerate(records, start=1):
+        timeframe_id, timeframe = parse_timeframe_record(record, position)
+
+        # A file exported from one session has unique IDs. Later records would silently replace earlier ones.
+        if timeframe_id in timeframes:
+            raise ValueError(f"record {position}: duplicate timeframe ID \"{timeframe_id}\".")
+
+        timeframes[timeframe_id] = timeframe
+
+    return timeframes
+
+
+def parse_timeframe_record(record: dict, position: int) -> Tuple[str, TimeFrame]:
+    """ Validate a record of a file exported by export_timeframes() the same way as the arguments of 'add'.
+
+    Args:
+        record (dict): the record, with "timeframe_id", "utc_offset", "start_time" and "end_time".
+        position (int): position of the record in the file, used in error messages.
+
+    Returns:
+        a tuple (timeframe_id, timeframe).
+
+    Raises:
+        ValueError: if the record is invalid.
+    """
+
+    try:
+        timeframe_id, utc_offset, start_time, end_time = (
+            record["timeframe_id"], record["utc_offset"], record["start_time"], record["end_time"]
+        )
+    except (KeyError, TypeError):
+        raise ValueError(f"record {position}: expected timeframe_id, utc_offset, start_time and end_time.") from None
+
+    if not all(isinstance(value, str) and value for value in (timeframe_id, utc_offset, start_time, end_time)):
+        raise ValueError(f"record {position}: timeframe_id, utc_offset, start_time and end_time must be strings.")
+
+    # Format and validate the UTC offset.
+    try:
+        utc_offset = format_utc_offset(utc_offset)
+    except ValueError as ve:
+        raise ValueError(f"record {position}: utc_offset: {ve}") from None
+
+    flag, error_message = is_valid_offset(utc_offset)
+    if flag is False:
+        raise ValueError(f"record {position}: {error_message}")
+
+    # Validate the start/end time formats.
+    for name, time in (("start_time", start_time), ("end_time", end_time)):
+        if not is_valid_datetime(time):
+            raise ValueError(f"record {position}: Incorrect format of {name}. Expected format: DD-MM-YY HH:MM.")
+
+    try:
+        return timeframe_id, TimeFrame(utc_offset, start_time, end_time)
+    except ValueError as ve:
+        raise ValueError(f"record {position}: {ve}") from None
+
+
+def write_text_output(output: str, path: str | None) -> str | None:
+    """ Write text output to a file, or return it if no path was provided. """
+
+    if path is None:
+        return output
+
+    with open(path, "w") as file:
+        file.write(output)
+
+    return None
@@ -0,0 +1,332 @@
+import heapq
+import json
+import os
+import tempfile
+from array import array
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Iterator, Tuple
+
+from export import parse_timeframe_record
+from timeframe import EPOCH, TimeFrame
+
+# Approximate number of bytes of memory used per endpoint while a run is sorted: one 8 byte array item, plus a
+# Python int and a list slot while sorting.
+BYTES_PER_EVENT = 48
+
+# Maximum number of runs merged at once. More runs are merged in several passes to bound the number of open files.
+MAX_MERGE_FAN_IN = 128
+
+# Number of endpoints read from a run at once while merging, at most.
+MAX_READ_BLOCK = 1 << 16
+
+
+def encode_endpoints(timeframe: TimeFrame) -> Tuple[int, int]:
+    """ Encode the normalized start/end times of a timeframe as sortable endpoint events.
+
+    Each event is the epoch time in seconds shifted left by one bit, with the lowest bit set for start events, so the
+    events of all timeframes can be sorted as plain 64-bit integers.
+
+    Args:
+        timeframe (TimeFrame): the timeframe.
+
+    Returns:
+        a tuple (start_event, end_event).
+    """
+
+    return timeframe.norm_start_epoch << 1 | 1, timeframe.norm_end_epoch << 1
+
+
+def read_records(path: str) -> Iterator[TimeFrame]:
+    """ Read the timeframes of a JSON Lines file one line at a time, e.g. a file exported with 'ls --format jsonl'.
+
+    Each record is validated the same way as the records of 'merge'. See export.parse_timeframe_record().
+
+    Args:
+        path (str): path of the file. Each line is a record with "timeframe_id", "utc_offset", "start_time" and
+                    "end_time".
+
+    Yields:
+        each record as a TimeFrame object.
+
+    Raises:
+        ValueError: if a line is not a valid record. The line number is used as the position of the record.
+    """
+
+    with open(path, "r") as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as error:
+                raise ValueError(f"record {line_number}: invalid JSON: {error}") from None
+
+            yield parse_timeframe_record(record, line_number)[1]
+
+
+def write_sorted_runs(timeframes: Iterable[TimeFrame], directory: str, run_length: int,
+                      progress: Callable[[str, int, int], None] = None) -> Tuple[list, int]:
+    """ Split the endpoint events of a stream of timeframes into sorted runs stored in temporary files.
+
+    Args:
+        timeframes (Iterable[TimeFrame]): the timeframes.
+        directory (str): directory to store the runs in.
+        run_length (int): maximum number of events held in memory and stored in one run.
+        progress (Callable): called as progress("read", records_read, 0) after each run. Optional.
+
+    Returns:
+        a tuple (run_paths, record_count).
+    """
+
+    run_paths = []
+    record_count = 0
+    events = array("q")
+
+    def flush() -> None:
+        # Sort the buffered events and store them as the next run.
+        path = os.path.join(directory, f"run-{len(run_paths)}.bin")
+        with open(path, "wb") as file:
+            array("q", sorted(events)).tofile(file)
+        run_paths.append(path)
+        del events[:]
+
+        if progress is not None:
+            progress("read", record_count, 0)
+
+    for timeframe in timeframes:
+        events.extend(encode_endpoints(timeframe))
+        record_count += 1
+
+        if len(events) >= run_length:
+            flush()
+
+    if events:
+        flush()
+
+    return run_paths, record_count
+
+
+def read_run(path: str, block_size: int) -> Iterator[int]:
+    """ Read the events of a sorted run in blocks.
+
+    Args:
+        path (str): path of the run.
+        block_size (int): number of events to read at once.
+
+    Yields:
+        each event of the run in order.
+    """
+
+    with open(path, "rb") as file:
+        while True:
+            block = array("q")
+            try:
+                block.fromfile(file, block_size)
+            except EOFError:
+                # The last block of the run is shorter. fromfile() still reads the remaining events.
+                pass
+
+            if not block:
+                return
+
+            yield from block
+
+
+def merge_runs(run_paths: list, directory: str, memory_budget: int) -> Iterator[int]:
+    """ K-way merge sorted runs into one sorted stream of events.
+
+    If there are more than MAX_MERGE_FAN_IN runs, groups of runs are first merged into longer runs.
+
+    Args:
+        run_paths (list): paths of the sorted runs. Merged runs are deleted.
+        directory (str): directory to store intermediate runs in.
+        memory_budget (int): bytes of memory available for the read buffers.
+
+    Yields:
+        every event of the runs in sorted order.
+    """
+
+    while len(run_paths) > MAX_MERGE_FAN_IN:
+        merged_paths = []
+
+        for group_start in range(0, len(run_paths), MAX_MERGE_FAN_IN):
+            group = run_paths[group_start:group_start + MAX_MERGE_FAN_IN]
+            path = os.path.join(directory, f"merged-{len(merged_paths)}-{os.path.basename(group[0])}")
+
+            # Write the merged group in blocks.
+            block_size = read_block_size(len(group) + 1, memory_budget)
+            with open(path, "wb") as file:
+                block = array("q")
+                for event in heapq.merge(*(read_run(run_path, block_size) for run_path in group)):
+                    block.append(event)
+                    if len(block) >= block_size:
+                        block.tofile(file)
+                        del block[:]
+                block.tofile(file)
+
+            for run_path in group:
+                os.remove(run_path)
+            merged_paths.append(path)
+
+        run_paths = merged_paths
+
+    block_size = read_block_size(len(run_paths), memory_budget)
+    yield from heapq.merge(*(read_run(run_path, block_size) for run_path in run_paths))
+
+
+def read_block_size(run_count: int, memory_budget: int) -> int:
+    """ Select the number of events read from each run at once, so that the read buffers fit in the memory budget.
+
+    Args:
+        run_count (int): number of runs read at the same time.
+        memory_budget (int): bytes of memory available for the read buffers.
+
+    Returns:
+        the block size in events.
+    """
+
+    return max(1024, min(MAX_READ_BLOCK, memory_budget // (max(run_count, 1) * BYTES_PER_EVENT)))
+
+
+def sweep_events(events: Iterable[int], record_count: int, quorum: int,
+                 progress: Callable[[str, int, int], None] = None) -> dict:
+    """ Sweep sorted endpoint events, tracking how many timeframes cover each point in time.
+
+    Args:
+        events (Iterable[int]): the sorted endpoint events. See encode_endpoints().
+        record_count (int): number of timeframes.
+        quorum (int): minimum number of timeframes covering a quorum window.
+        progress (Callable): called as progress("sweep", events_swept, total_events) periodically. Optional.
+
+    Returns:
+        the statistics of the sweep. See sweep_file().
+    """
+
+    total_events = 2 * record_count
+
+    # Number of timeframes covering the current point in time, and the highest coverage seen.
+    coverage = peak = 0
+
+    # Seconds spent at each coverage, stored as {coverage: seconds}.
+    histogram = {}
+
+    # Start of the current common/quorum window, or None outside of one.
+    common_start = quorum_start = None
+    common_window = longest_quorum_window = None
+    quorum_window_count = 0
+
+    def close_quorum_window(end_time: int) -> None:
+        # Count the quorum window and keep it if it is the longest.
+        nonlocal quorum_window_count, longest_quorum_window
+        quorum_window_count += 1
+        if longest_quorum_window is None or end_time - quorum_start > longest_quorum_window[1] - longest_quorum_window[0]:
+            longest_quorum_window = (quorum_start, end_time)
+
+    previous_time = None
+
+    for index, event in enumerate(events):
+        time = event >> 1
+
+        # All events at the previous time are applied, so the coverage holds from the previous time until this one.
+        # Coverage changes are only evaluated between different times, so timeframes that touch form one window.
+        if previous_time is not None and time != previous_time:
+            histogram[coverage] = histogram.get(coverage, 0) + time - previous_time
+            peak = max(peak, coverage)
+
+            # Enter or leave the common window.
+            if coverage == record_count and common_start is None:
+                common_start = previous_time
+            elif coverage < record_count and common_start is not None:
+                common_window = (common_start, previous_time)
+                common_start = None
+
+            # Enter or leave a quorum window.
+            if coverage >= quorum and quorum_start is None:
+                quorum_start = previous_time
+            elif coverage < quorum and quorum_start is not None:
+                close_quorum_window(previous_time)
+                quorum_start = None
+
+        previous_time = time
+        coverage += 1 if event & 1 else -1
+
+        if progress is not None and index % (1 << 20) == 0:
+            progress("sweep", index, total_events)
+
+    # Every timeframe has ended after the last event, so open windows end there.
+    if common_start is not None:
+        common_window = (common_start, previous_time)
+    if quorum_start is not None:
+        close_quorum_window(previous_time)
+
+    if progress is not None:
+        progress("sweep", total_events, total_events)
+
+    return {
+        "records": record_count,
+        "peak": peak,
+        "common_window": to_datetimes(common_window),
+        "quorum": quorum,
+        "quorum_windows": quorum_window_count,
+        "longest_quorum_window": to_datetimes(longest_quorum_window),
+        "histogram": dict(sorted(histogram.items())),
+    }
+
+
+def to_datetimes(window: Tuple[int, int] | None) -> Tuple[datetime, datetime] | None:
+    """ Convert a window of epoch seconds to normalized datetime objects.
+
+    Args:
+        window (tuple): the (start, end) epoch seconds, or None.
+
+    Returns:
+        the (start, end) datetime objects, or None.
+    """
+
+    if window is None:
+        return None
+
+    return EPOCH + timedelta(seconds=window[0]), EPOCH + timedelta(seconds=window[1])
+
+
+def sweep_file(path: str, quorum: int = None, memory_mb: int = 256, temp_dir: str = None,
+               progress: Callable[[str, int, int], None] = None) -> dict:
+    """ Compute overlap statistics of a JSON Lines file of timeframes that may not fit in memory.
+
+    The timeframes are read in chunks, their normalized endpoints are sorted into runs stored in temporary files, and
+    the runs are k-way merged into a single sweep. Memory use is bounded by the memory budget, not the file size.
+
+    Args:
+        path (str): path of the file. See read_records().
+        quorum (int): minimum number of timeframes covering a quorum window. Defaults to all timeframes.
+        memory_mb (int): memory budget in megabytes.
+        temp_dir (str): directory for the temporary runs. Defaults to the system temporary directory.
+        progress (Callable): called as progress(phase, done, total) while reading and sweeping. Optional.
+
+    Returns:
+        the statistics, stored as a dict with:
+            "records": number of timeframes,
+            "peak": highest number of timeframes covering the same point in time,
+            "common_window": the normalized (start, end) times covered by every timeframe, or None,
+            "quorum": the quorum used,
+            "quorum_windows": number of separate windows covered by at least quorum timeframes,
+            "longest_quorum_window": the longest of those windows, or None,
+            "histogram": seconds covered by each number of timeframes, stored as {coverage: seconds}.
+    """
+
+    if memory_mb <= 0:
+        raise ValueError("memory budget must be a positive number of megabytes.")
+    if quorum is not None and quorum <= 0:
+        raise ValueError("quorum must be a positive number of timeframes.")
+
+    memory_budget = memory_mb * 1024 * 1024
+
+    with tempfile.TemporaryDirectory(prefix="timesync-sweep-", dir=temp_dir) as directory:
+        run_paths, record_count = write_sorted_runs(
+            read_records(path), directory, max(1024, memory_budget // BYTES_PER_EVENT), progress
+        )
+
+        events = merge_runs(run_paths, directory, memory_budget)
+
+        return sweep_events(events, record_count, quorum if quorum is not None else record_count, progress)
@@ -0,0 +1,275 @@
+from collections.abc import Mapping
+from typing import Any, Iterator, Tuple
+
+
+class Node:
+    """
+    Immutable node of a persistent treap, a binary search tree on the keys and a heap on the priorities.
+
+    Priorities are derived from the keys, so the same set of keys always forms the same tree shape. Updates copy only
+    the O(log n) nodes on the path to the changed key and share every other node with the previous version.
+    """
+
+    __slots__ = ("key", "value", "priority", "left", "right", "size")
+
+    def __init__(self, key: str, value: Any, priority: int, left: "Node" = None, right: "Node" = None) -> None:
+        self.key = key
+        self.value = value
+        self.priority = priority
+        self.left = left
+        self.right = right
+
+        # Number of nodes in the subtree rooted at this node.
+        self.size = 1 + size(left) + size(right)
+
+    def with_children(self, left: "Node", right: "Node") -> "Node":
+        """ Copy the node with new children, or return the node itself if the children are unchanged.
+
+        Args:
+            left (Node): the new left child.
+            right (Node): the new right child.
+
+        Returns:
+            the node with the given children.
+        """
+
+        if left is self.left and right is self.right:
+            return self
+
+        return Node(self.key, self.value, self.priority, left, right)
+
+
+def size(node: Node | None) -> int:
+    """ Get the number of keys in a treap.
+
+    Args:
+        node (Node): root of the treap.
+
+    Returns:
+        the number of keys.
+    """
+
+    return 0 if node is None else node.size
+
+
+def lookup(node: Node | None, key: str, default: Any = None) -> Any:
+    """ Get the value stored under a key.
+
+    Args:
+        node (Node): root of the treap.
+        key (str): the key to look up.
+        default (Any): value returned if the key is not present.
+
+    Returns:
+        the value stored under the key, or the default.
+    """
+
+    while node is not None:
+        if key == node.key:
+            return node.value
+        node = node.left if key < node.key else node.right
+
+    return default
+
+
+def split(node: Node | None, key: str) -> Tuple[Node | None, Node | None, Node | None]:
+    """ Split a treap into the keys less than a key, the node of the key itself, and the keys greater than it.
+
+    Subtrees that lie entirely on one side of the key are shared, not copied.
+
+    Args:
+        node (Node): root of the treap.
+        key (str): the key to split at.
+
+    Returns:
+        a tuple (left_root, node_of_key, right_root). The node of the key is None if the key is not present.
+    """
+
+    if node is None:
+        return None, None, None
+
+    if key == node.key:
+        return node.left, node, node.right
+
+    if key < node.key:
+        left, middle, right = split(node.left, key)
+        return left, middle, node.with_children(right, node.right)
+
+    left, middle, right = split(node.right, key)
+    return node.with_children(node.left, left), middle, right
+
+
+def join(left: Node | None, right: Node | None) -> Node | None:
+    """ Join two treaps where every key of the left treap is less than every key of the right treap.
+
+    Args:
+        left (Node): root of the left treap.
+        right (Node): root of the right treap.
+
+    Returns:
+        root of the joined treap.
+    """
+
+    if left is None:
+        return right
+    if right is None:
+        return left
+
+    if left.priority > right.priority:
+        return left.with_children(left.left, join(left.right, right))
+
+    return right.with_children(join(left, right.left), right.right)
+
+
+def assoc(node: Node | None, key: str, value: Any) -> Node:
+    """ Store a value under a key, replacing any value already stored under it.
+
+    Args:
+        node (Node): root of the treap. It is not modified.
+        key (str): the key.
+        value (Any): the value.
+
+    Returns:
+        root of the new version of the treap.
+    """
+
+    priority = hash(key)
+
+    def insert(node: Node | None) -> Node:
+        if node is None:
+            return Node(key, value, priority)
+
+        # Replace the value of an existing key. The shape of the tree does not change.
+        if key == node.key:
+            return Node(key, value, priority, node.left, node.right)
+
+        # The new key belongs above this node: split the subtree around it. The key cannot already be in the subtree,
+        # since its node would have the same priority.
+        if priority > node.priority:
+            left, _, right = split(node, key)
+            return Node(key, value, priority, left, right)
+
+        if key < node.key:
+            return node.with_children(insert(node.left), node.right)
+
+        return node.with_children(node.left, insert(node.right))
+
+    return insert(node)
+
+
+def dissoc(node: Node | None, key: str) -> Node | None:
+    """ Remove a key and its value.
+
+    Args:
+        node (Node): root of the treap. It is not modified.
+        key (str): the key. Missing keys are ignored.
+
+    Returns:
+        root of the new version of the treap.
+    """
+
+    if node is None:
+        return None
+
+    if key == node.key:
+        return join(node.left, node.right)
+
+    if key < node.key:
+        return node.with_children(dissoc(node.left, key), node.right)
+
+    return node.with_children(node.left, dissoc(node.right, key))
+
+
+def iterate(node: Node | None) -> Iterator[Tuple[str, Any]]:
+    """ Iterate over the keys and values of a treap in order of key.
+
+    Args:
+        node (Node): root of the treap.
+
+    Yields:
+        a tuple (key, value) for every key.
+    """
+
+    stack = []
+
+    while stack or node is not None:
+        # Descend to the leftmost node not yet visited.
+        while node is not None:
+            stack.append(node)
+            node = node.left
+
+        node = stack.pop()
+        yield node.key, node.value
+        node = node.right
+
+
+def diff(old: Node | None, new: Node | None) -> Iterator[Tuple[str, Any, Any]]:
+    """ Find the keys whose values differ between two versions of a treap.
+
+    Subtrees shared by both versions are skipped without being visited, so two versions that differ in k keys are
+    compared in about O(k log n) time.
+
+    Args:
+        old (Node): root of the old version.
+        new (Node): root of the new version.
+
+    Yields:
+        a tuple (key, old_value, new_value) for every changed key in order of key. The old value is None for added
+        keys and the new value is None for removed keys.
+    """
+
+    # Shared subtree: nothing changed.
+    if old is new:
+        return
+
+    if old is None:
+        for key, value in iterate(new):
+            yield key, None, value
+        return
+
+    if new is None:
+        for key, value in iterate(old):
+            yield key, value, None
+        return
+
+    # Split the new version at the old root's key and compare both sides separately.
+    left, middle, right = split(new, old.key)
+
+    yield from diff(old.left, left)
+
+    if middle is None:
+        yield old.key, old.value, None
+    elif middle.value is not old.value:
+        yield old.key, old.value, middle.value
+
+    yield from diff(old.right, right)
+
+
+class PersistentMap(Mapping):
+    """
+    Read-only mapping view of one version of a persistent treap.
+
+    The version never changes, so it can be read while the session keeps being modified.
+    """
+
+    __slots__ = ("root",)
+
+    def __init__(self, root: Node | None = None) -> None:
+        self.root = root
+
+    def __getitem__(self, key: str) -> Any:
+        # Sentinel to tell a missing key apart from a stored None.
+        missing = object()
+        value = lookup(self.root, key, missing)
+        if value is missing:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and lookup(self.root, key, self) is not self
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key, _ in iterate(self.root))
+
+    def __len__(self) -> int:
+        return size(self.root)
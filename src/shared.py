@@ -0,0 +1,448 @@
+import struct
+import time
+from datetime import datetime, timedelta
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Tuple
+
+from timeframe import EPOCH, TimeFrame
+
+# Bytes available for the name of the data block in the control block.
+DATA_NAME_SIZE = 64
+
+# Layout of the control block: sequence number, generation, number of timeframes, timeframe capacity, ID byte
+# capacity and the name of the data block.
+CONTROL_FORMAT = f"qqqqq{DATA_NAME_SIZE}s"
+
+# Maximum length in bytes of a session name. The data blocks are named "<name>-<block count>", and the name of every
+# data block must fit in the control block, whatever the block count.
+MAX_NAME_LENGTH = DATA_NAME_SIZE - len(f"-{2 ** 63 - 1}")
+CONTROL_SIZE = struct.calcsize(CONTROL_FORMAT)
+
+# Bytes used by each timeframe slot in the data block: normalized start/end times (int64), ID offset (int64),
+# ID length (int32) and UTC offset in minutes (int16).
+SLOT_SIZE = 8 + 8 + 8 + 4 + 2
+
+
+def data_layout(capacity: int) -> dict:
+    """ Get the byte offsets of the columns in a data block.
+
+    Args:
+        capacity (int): number of timeframe slots in the data block.
+
+    Returns:
+        a dict of the byte offset of each column, stored as {column_name: offset}.
+    """
+
+    # Columns are ordered by item size, so each column is aligned to its item size.
+    return {
+        "norm_start": 0,
+        "norm_end": 8 * capacity,
+        "id_offset": 16 * capacity,
+        "id_length": 24 * capacity,
+        "utc_offset": 28 * capacity,
+        "ids": 30 * capacity,
+    }
+
+
+def attach_shared_memory(name: str) -> SharedMemory:
+    """ Attach to an existing shared memory block without taking ownership of it.
+
+    The resource tracker would otherwise unlink the block when the attaching process exits.
+
+    Args:
+        name (str): name of the shared memory block.
+
+    Returns:
+        the attached SharedMemory object.
+    """
+
+    shared_memory = SharedMemory(name=name)
+    resource_tracker.unregister(shared_memory._name, "shared_memory")
+
+    return shared_memory
+
+
+def to_datetime(epoch_seconds: int) -> datetime:
+    """ Convert seconds since the epoch to a normalized datetime object. """
+
+    return EPOCH + timedelta(seconds=epoch_seconds)
+
+
+class SharedSessionWriter:
+    """
+    Publishes the normalized start/end times, UTC offsets and IDs of a session's timeframes to shared memory.
+
+    A fixed-size control block, named after the session, holds a generation counter and the name of the data block
+    holding the columns. Every update is wrapped in a sequence lock: the sequence number is odd while the columns are
+    being written, so readers can detect and retry reads that overlap with a write. When the data block is full, the
+    columns are copied to a new data block twice the size and the control block is pointed at it.
+    """
+
+    def __init__(self, name: str, capacity: int = 1024) -> None:
+        """
+        Args:
+            name (str): name of the control block. Readers attach using this name.
+            capacity (int): initial number of timeframe slots.
+
+        Raises:
+            ValueError: if the name is longer than MAX_NAME_LENGTH bytes.
+        """
+
+        # A longer name would be cut in the control block, and readers would attach to a data block that does not exist.
+        if len(name.encode()) > MAX_NAME_LENGTH:
+            raise ValueError(f"name must be at most {MAX_NAME_LENGTH} bytes long.")
+
+        self.name = name
+
+        # Slot of each timeframe ID, stored as {timeframe_id: slot}. IDs are stored in slot order in slot_ids.
+        self.slots = {}
+        self.slot_ids = []
+
+        # Number of bytes used in the ID column, and number of those bytes used by live IDs. Bytes of removed IDs are
+        # reclaimed when the IDs are compacted or the data block is resized.
+        self.id_bytes_used = 0
+        self.live_id_bytes = 0
+
+        # Number of data blocks created, used to name the next data block.
+        self.block_count = 0
+
+        self.control = SharedMemory(name=name, create=True, size=CONTROL_SIZE)
+        self.data = None
+        self.capacity = 0
+        self.id_capacity = 0
+        self.sequence = 0
+        self.generation = 0
+
+        self.allocate(capacity, capacity * 16)
+
+    def allocate(self, capacity: int, id_capacity: int) -> None:
+        """ Move the columns to a new data block.
+
+        Args:
+            capacity (int): number of timeframe slots in the new data block.
+            id_capacity (int): number of bytes available for IDs in the new data block.
+        """
+
+        self.block_count += 1
+        data = SharedMemory(name=f"{self.name}-{self.block_count}", create=True, size=SLOT_SIZE * capacity + id_capacity)
+        layout = data_layout(capacity)
+
+        # Copy the live timeframes to the new data block, compacting the IDs.
+        count = len(self.slot_ids)
+        if self.data is not None:
+            old_layout = data_layout(self.capacity)
+            old_buffer = self.data.buf
+
+            for column, item_size in (("norm_start", 8), ("norm_end", 8), ("utc_offset", 2)):
+                data.buf[layout[column]:layout[column] + count * item_size] = \
+                    old_buffer[old_layout[column]:old_layout[column] + count * item_size]
+
+        self.begin_write()
+
+        old_data = self.data
+        self.data = data
+        self.capacity = capacity
+        self.id_capacity = id_capacity
+
+        self.rewrite_ids()
+
+        self.end_write()
+
+        # Readers still attached to the old data block keep their mapping until they detach.
+        if old_data is not None:
+            old_data.close()
+            old_data.unlink()
+
+    def rewrite_ids(self) -> None:
+        """ Rewrite the IDs of the live slots contiguously, dropping the bytes of removed IDs. Part of a write. """
+
+        self.id_bytes_used = 0
+        for slot, timeframe_id in enumerate(self.slot_ids):
+            self.write_id(slot, timeframe_id)
+
+    def begin_write(self) -> None:
+        """ Mark the start of a write. Readers retry reads that overlap with a write. """
+
+        self.sequence += 1
+        struct.pack_into("q", self.control.buf, 0, self.sequence)
+
+    def end_write(self) -> None:
+        """ Publish the header and mark the end of a write. """
+
+        # The header follows the sequence number, which stays odd until the header is complete.
+        self.generation += 1
+        struct.pack_into(CONTROL_FORMAT[1:], self.control.buf, 8, self.generation, len(self.slot_ids),
+                         self.capacity, self.id_capacity, self.data.name.encode())
+
+        self.sequence += 1
+        struct.pack_into("q", self.control.buf, 0, self.sequence)
+
+    def write_id(self, slot: int, timeframe_id: str) -> None:
+        """ Write the ID of a slot to the end of the ID column. """
+
+        encoded_id = timeframe_id.encode()
+        layout = data_layout(self.capacity)
+
+        offset = layout["ids"] + self.id_bytes_used
+        self.data.buf[offset:offset + len(encoded_id)] = encoded_id
+        struct.pack_into("q", self.data.buf, layout["id_offset"] + 8 * slot, self.id_bytes_used)
+        struct.pack_into("i", self.data.buf, layout["id_length"] + 4 * slot, len(encoded_id))
+
+        self.id_bytes_used += len(encoded_id)
+
+    def write_slot(self, slot: int, timeframe: TimeFrame) -> None:
+        """ Write the times and UTC offset of a timeframe to a slot. """
+
+        layout = data_layout(self.capacity)
+        struct.pack_into("q", self.data.buf, layout["norm_start"] + 8 * slot, timeframe.norm_start_epoch)
+        struct.pack_into("q", self.data.buf, layout["norm_end"] + 8 * slot, timeframe.norm_end_epoch)
+        struct.pack_into("h", self.data.buf, layout["utc_offset"] + 2 * slot, timeframe.offset_minutes)
+
+    def set(self, timeframe_id: str, timeframe: TimeFrame) -> None:
+        """ Add a timeframe, or replace the timeframe with the same ID.
+
+        Args:
+            timeframe_id (str): ID of the timeframe.
+            timeframe (TimeFrame): the timeframe.
+        """
+
+        slot = self.slots.get(timeframe_id)
+
+        # A new ID needs a free slot and room for its bytes. An existing ID is overwritten in its slot.
+        if slot is None:
+            id_size = len(timeframe_id.encode())
+
+            # Grow the data block if there is no free slot.
+            if len(self.slot_ids) >= self.capacity:
+                self.allocate(self.capacity * 2, max(self.id_capacity * 2, 2 * (self.live_id_bytes + id_size)))
+
+            # No room for the ID. If the live IDs fill at most half of the ID column, reclaim the bytes of removed IDs
+            # in place, which frees at least half of the column, so compactions stay rare. Otherwise grow the column.
+            elif self.id_bytes_used + id_size > self.id_capacity:
+                if self.live_id_bytes + id_size <= self.id_capacity // 2:
+                    self.begin_write()
+                    self.rewrite_ids()
+                    self.end_write()
+                else:
+                    self.allocate(self.capacity, 2 * max(self.id_capacity, self.live_id_bytes + id_size))
+
+        self.begin_write()
+
+        if slot is None:
+            slot = len(self.slot_ids)
+            self.slots[timeframe_id] = slot
+            self.slot_ids.append(timeframe_id)
+            self.write_id(slot, timeframe_id)
+            self.live_id_bytes += id_size
+
+        self.write_slot(slot, timeframe)
+
+        self.end_write()
+
+    def remove(self, timeframe_id: str) -> None:
+        """ Remove a timeframe. The last slot is moved into the removed slot, keeping the columns dense.
+
+        Args:
+            timeframe_id (str): ID of a published timeframe.
+        """
+
+        self.begin_write()
+
+        slot = self.slots.pop(timeframe_id)
+        last_slot = len(self.slot_ids) - 1
+        self.live_id_bytes -= len(timeframe_id.encode())
+
+        if slot != last_slot:
+            layout = data_layout(self.capacity)
+            buffer = self.data.buf
+
+            # Move the last slot's columns into the removed slot.
+            for column, item_size in (("norm_start", 8), ("norm_end", 8), ("id_offset", 8), ("id_length", 4),
+                                      ("utc_offset", 2)):
+                source = layout[column] + item_size * last_slot
+                target = layout[column] + item_size * slot
+                buffer[target:target + item_size] = buffer[source:source + item_size]
+
+            last_id = self.slot_ids[last_slot]
+            self.slot_ids[slot] = last_id
+            self.slots[last_id] = slot
+
+        self.slot_ids.pop()
+
+        self.end_write()
+
+    def publish(self, timeframes: dict) -> None:
+        """ Replace the published timeframes.
+
+        Args:
+            timeframes (dict): timeframes to publish, stored as {timeframe_id: TimeFrame_object}.
+        """
+
+        self.clear()
+        for timeframe_id, timeframe in timeframes.items():
+            self.set(timeframe_id, timeframe)
+
+    def clear(self) -> None:
+        """ Remove all published timeframes. """
+
+        self.begin_write()
+
+        self.slots.clear()
+        self.slot_ids.clear()
+        self.id_bytes_used = 0
+        self.live_id_bytes = 0
+
+        self.end_write()
+
+    def close(self) -> None:
+        """ Stop publishing and remove the shared memory blocks. """
+
+        self.data.close()
+        self.data.unlink()
+        self.control.close()
+        self.control.unlink()
+
+
+class SharedSessionReader:
+    """
+    Attaches to a session published by a SharedSessionWriter and answers queries directly on the shared columns.
+
+    The columns are read through memoryviews of the shared memory, without copying.
+    """
+
+    def __init__(self, name: str) -> None:
+        """
+        Args:
+            name (str): name of the control block.
+        """
+
+        self.control = attach_shared_memory(name)
+        self.data = None
+        self.data_name = None
+
+    def read(self, query):
+        """ Run a query on a consistent view of the columns, retrying if the writer updated them meanwhile.
+
+        Args:
+            query (Callable): function called with (columns, count) that computes the result. columns is a dict of
+                              memoryviews of the shared columns.
+
+        Returns:
+            a tuple (generation, result).
+        """
+
+        while True:
+            sequence = struct.unpack_from("q", self.control.buf, 0)[0]
+
+            # A write is in progress.
+            if sequence % 2 == 1:
+                time.sleep(0)
+                continue
+
+            _, generation, count, capacity, id_capacity, data_name = struct.unpack_from(CONTROL_FORMAT,
+                                                                                        self.control.buf, 0)
+            data_name = data_name.rstrip(b"\0").decode()
+
+            try:
+                # Attach to the current data block if the writer moved the columns.
+                if data_name != self.data_name:
+                    self.release()
+                    self.data = attach_shared_memory(data_name)
+                    self.data_name = data_name
+
+                columns = self.columns(capacity, id_capacity)
+                try:
+                    result = query(columns, count)
+                finally:
+                    for column in columns.values():
+                        column.release()
+
+            # The view was inconsistent because the writer updated the columns meanwhile. Retry.
+            except (OSError, IndexError, ValueError):
+                if struct.unpack_from("q", self.control.buf, 0)[0] == sequence:
+                    raise
+                continue
+
+            # The result is consistent only if no write started or finished meanwhile.
+            if struct.unpack_from("q", self.control.buf, 0)[0] == sequence:
+                return generation, result
+
+    def columns(self, capacity: int, id_capacity: int) -> dict:
+        """ Get memoryviews of the columns in the data block. """
+
+        layout = data_layout(capacity)
+        buffer = self.data.buf
+
+        return {
+            "norm_start": buffer[layout["norm_start"]:layout["norm_end"]].cast("q"),
+            "norm_end": buffer[layout["norm_end"]:layout["id_offset"]].cast("q"),
+            "id_offset": buffer[layout["id_offset"]:layout["id_length"]].cast("q"),
+            "id_length": buffer[layout["id_length"]:layout["utc_offset"]].cast("i"),
+            "utc_offset": buffer[layout["utc_offset"]:layout["ids"]].cast("h"),
+            "ids": buffer[layout["ids"]:layout["ids"] + id_capacity],
+        }
+
+    @staticmethod
+    def read_id(columns: dict, slot: int) -> str:
+        """ Decode the timeframe ID of a slot. """
+
+        offset = columns["id_offset"][slot]
+        return bytes(columns["ids"][offset:offset + columns["id_length"][slot]]).decode()
+
+    def generation(self) -> int:
+        """ Get the generation of the published session. Incremented by every update. """
+
+        return self.read(lambda columns, count: None)[0]
+
+    def common_timeframe(self) -> Tuple[datetime, datetime] | None:
+        """ Find the common timeframe of the published timeframes.
+
+        Returns:
+            the normalized (start, end) times of the common timeframe, or None if it does not exist.
+        """
+
+        def query(columns, count):
+            if count == 0:
+                return None
+            return max(columns["norm_start"][:count]), min(columns["norm_end"][:count])
+
+        window = self.read(query)[1]
+
+        if window is None or window[0] >= window[1]:
+            return None
+
+        return to_datetime(window[0]), to_datetime(window[1])
+
+    def who(self, time_point: datetime) -> list:
+        """ Find the timeframes that include a normalized time.
+
+        Args:
+            time_point (datetime): normalized (UTC +00:00) time.
+
+        Returns:
+            a list of the IDs of the timeframes that include the time.
+        """
+
+        epoch_seconds = (time_point - EPOCH) // timedelta(seconds=1)
+
+        def query(columns, count):
+            starts, ends = columns["norm_start"], columns["norm_end"]
+            return [self.read_id(columns, slot) for slot in range(count)
+                    if starts[slot] <= epoch_seconds < ends[slot]]
+
+        return self.read(query)[1]
+
+    def release(self) -> None:
+        """ Detach from the current data block. """
+
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+            self.data_name = None
+
+    def close(self) -> None:
+        """ Detach from the shared session. """
+
+        self.release()
+        self.control.close()
@@ -0,0 +1,168 @@
+import heapq
+from datetime import datetime
+from typing import Iterable, Tuple
+
+from timeframe import TimeFrame
+from utils import format_utc_offset, is_valid_offset
+
+
+def normalize_record(record: tuple) -> TimeFrame:
+    """ Normalize a (utc_offset, start_time, end_time) record to UTC +00:00.
+
+    Args:
+        record (tuple): the UTC offset (relaxed formats are accepted, e.g. "+6" or "-0530") and the start/end times as
+                        datetime objects or strings in the format DD-MM-YY HH:MM.
+
+    Returns:
+        the record as a TimeFrame object.
+    """
+
+    utc_offset, start_time, end_time = record
+
+    # Format and validate the UTC offset.
+    utc_offset = format_utc_offset(utc_offset)
+    flag, error_message = is_valid_offset(utc_offset)
+    if flag is False:
+        raise ValueError(error_message)
+
+    return TimeFrame(utc_offset, start_time, end_time)
+
+
+def stream_common_timeframe(records: Iterable[tuple], allow_absent: int = 0,
+                            stop_when_empty: bool = True) -> Tuple[datetime, datetime] | None:
+    """ Find the common timeframe of a stream of records in a single pass.
+
+    Records are consumed one at a time, so any iterator works, e.g. a generator or a database cursor. Only the
+    running intersection is kept, O(1) state, or the k + 1 latest start times and earliest end times when up to k
+    participants may be absent, O(k) state.
+
+    Args:
+        records (Iterable[tuple]): (utc_offset, start_time, end_time) records. See normalize_record().
+        allow_absent (int): maximum number of participants that may be left out of the common timeframe. The
+                            longest timeframe shared by all other participants is returned.
+        stop_when_empty (bool): stop consuming records as soon as the common timeframe becomes empty. Only applies
+                                when allow_absent is 0, since the timeframe cannot grow again.
+
+    Returns:
+        the normalized (start, end) times of the common timeframe, or None if it does not exist.
+    """
+
+    if allow_absent < 0:
+        raise ValueError("allow_absent cannot be negative.")
+
+    if allow_absent == 0:
+        return intersect_stream(records, stop_when_empty)
+
+    return quorum_stream(records, allow_absent)
+
+
+def intersect_stream(records: Iterable[tuple], stop_when_empty: bool = True) -> Tuple[datetime, datetime] | None:
+    """ Find the common timeframe of all records in a single pass with O(1) state.
+
+    Args:
+        records (Iterable[tuple]): (utc_offset, start_time, end_time) records. See normalize_record().
+        stop_when_empty (bool): stop consuming records as soon as the common timeframe becomes empty.
+
+    Returns:
+        the normalized (start, end) times of the common timeframe, or None if it does not exist.
+    """
+
+    latest_start_time = earliest_end_time = None
+
+    for record in records:
+        norm_start, norm_end = normalize_record(record).get_norm_times()
+
+        # Assign the record's normalized start time to latest_start_time if it is later.
+        if latest_start_time is None or norm_start > latest_start_time:
+            latest_start_time = norm_start
+
+        # Assign the record's normalized end time to earliest_end_time if it is earlier.
+        if earliest_end_time is None or norm_end < earliest_end_time:
+            earliest_end_time = norm_end
+
+        # The intersection can only shrink, so an empty intersection is final.
+        if stop_when_empty and latest_start_time >= earliest_end_time:
+            return None
+
+    # No records, or the latest start time >= the earliest end time: a common timeframe does not exist.
+    if latest_start_time is None or latest_start_time >= earliest_end_time:
+        return None
+
+    return latest_start_time, earliest_end_time
+
+
+def quorum_stream(records: Iterable[tuple], allow_absent: int) -> Tuple[datetime, datetime] | None:
+    """ Find the longest timeframe shared by all but at most k records in a single pass with O(k) state.
+
+    Leaving out k records can only move the start of the common timeframe back to one of the k + 1 latest start
+    times, and its end forward to one of the k + 1 earliest end times, so only those are kept.
+
+    Args:
+        records (Iterable[tuple]): (utc_offset, start_time, end_time) records. See normalize_record().
+        allow_absent (int): maximum number of records that may be left out (k).
+
+    Returns:
+        the normalized (start, end) times of the timeframe, or None if it does not exist.
+    """
+
+    # Number of start/end times to keep.
+    keep = allow_absent + 1
+
+    # Min-heap of the latest start times and max-heap of the earliest end times (negated), stored as
+    # (epoch_seconds, record_index, time) entries.
+    latest_starts = []
+    earliest_ends = []
+
+    # Number of consumed records.
+    count = 0
+
+    for record_index, record in enumerate(records):
+        timeframe = normalize_record(record)
+        count += 1
+
+        # Keep the record's start time if it is among the latest.
+        entry = (timeframe.norm_start_epoch, record_index, timeframe.norm_start_time)
+        if len(latest_starts) < keep:
+            heapq.heappush(latest_starts, entry)
+        elif entry > latest_starts[0]:
+            heapq.heapreplace(latest_starts, entry)
+
+        # Keep the record's end time if it is among the earliest.
+        entry = (-timeframe.norm_end_epoch, record_index, timeframe.norm_end_time)
+        if len(earliest_ends) < keep:
+            heapq.heappush(earliest_ends, entry)
+        elif entry > earliest_ends[0]:
+            heapq.heapreplace(earliest_ends, entry)
+
+    # No records.
+    if count == 0:
+        return None
+
+    # At least one record must remain.
+    allow_absent = min(allow_absent, count - 1)
+
+    starts = [(norm_start, record_index) for _, record_index, norm_start in sorted(latest_starts, reverse=True)]
+    ends = [(norm_end, record_index) for _, record_index, norm_end in sorted(earliest_ends, reverse=True)]
+
+    best_timeframe = None
+
+    # Leave out the a latest starting records, then the earliest ending records until k records are left out.
+    for absent_starts in range(allow_absent + 1):
+        absent = {record_index for _, record_index in starts[:absent_starts]}
+
+        for _, record_index in ends:
+            if len(absent) == allow_absent:
+                break
+            absent.add(record_index)
+
+        # Common timeframe of the remaining records.
+        start_time = next(norm_start for norm_start, record_index in starts if record_index not in absent)
+        end_time = next(norm_end for norm_end, record_index in ends if record_index not in absent)
+
+        # Keep the longest common timeframe.
+        if start_time >= end_time:
+            continue
+        if best_timeframe is None or end_time - start_time > best_timeframe[1] - best_timeframe[0]:
+            best_timeframe = (start_time, end_time)
+
+    return best_timeframe
@@ -4,6 +4,9 @@ from datetime import datetime, timedelta
 # Input Datetime formats.
 DATETIME_FORMAT = '%d-%m-%y %H:%M'
 
+# Reference point for epoch timestamps. Normalized times are UTC +00:00, so they are measured from the Unix epoch.
+EPOCH = datetime(1970, 1, 1)
+
 
 class TimeFrame:
     """
@@ -41,6 +44,17 @@ class TimeFrame:
         self.norm_start_time = self.start_time - delta
         self.norm_end_time = self.end_time - delta
 
+        # UTC offset in minutes and normalized times as seconds since the epoch, used for columnar exports.
+        self.offset_minutes = delta // timedelta(minutes=1)
+        self.norm_start_epoch = (self.norm_start_time - EPOCH) // timedelta(seconds=1)
+        self.norm_end_epoch = (self.norm_end_time - EPOCH) // timedelta(seconds=1)
+
+        # Row-level formatting caches. A TimeFrame is never mutated after creation, so its formatted rows can be reused
+        # across queries until the timeframe itself is replaced or removed.
+        self._attributes = None
+        self._local_times_cache = None
+        self._vis_string_cache = None
+
     def get_times(self) -> Tuple[datetime, datetime]:
         """ Get the start and end times of the TimeFrame.
 
@@ -78,14 +92,59 @@ class TimeFrame:
             list of localized times as strings.
         """
 
+        # Reuse the localized times if the same times were converted previously.
+        times = tuple(times)
+        if self._local_times_cache is not None and self._local_times_cache[0] == times:
+            return list(self._local_times_cache[1])
+
         # Create the time delta object. timedelta accepts negative values in parameters.
         delta = timedelta(hours=self.offset_hour, minutes=self.offset_min)
 
         # Calculate the localized time for each datetime object in "times" and convert them to strings.
         localized_times = [(time + delta).strftime(DATETIME_FORMAT) for time in times]
 
+        # Cache the localized times for the converted times.
+        self._local_times_cache = (times, tuple(localized_times))
+
         return localized_times
 
+    def to_vis_string(self, weight: int, earliest_start_time: datetime) -> str:
+        """ Build the visualization string of the timeframe.
+
+        Args:
+            weight (int): number of minutes represented by one character.
+            earliest_start_time (datetime): normalized time represented by the first character.
+
+        Returns:
+            a string with a "|" for every character that falls within the timeframe.
+        """
+
+        # Reuse the visualization string if the weight and earliest start time are unchanged.
+        key = (weight, earliest_start_time)
+        if self._vis_string_cache is not None and self._vis_string_cache[0] == key:
+            return self._vis_string_cache[1]
+
+        # Create timedelta object.
+        delta = timedelta(minutes=weight)
+
+        # Reference datetime is used to keep track of the time represented by the current character.
+        reference_datetime = earliest_start_time
+
+        # Visualization string.
+        vis_string = ""
+
+        while reference_datetime < self.norm_end_time:
+            # Add a "|" if the reference_datetime is within the timeframe. Else, print a whitespace.
+            vis_string += "|" if self.norm_start_time <= reference_datetime else " "
+
+            # Update the reference_datetime.
+            reference_datetime += delta
+
+        # Cache the visualization string.
+        self._vis_string_cache = (key, vis_string)
+
+        return vis_string
+
     def get_attributes(self) -> tuple:
         """ Get the attributes of the timeframe.
 
@@ -93,6 +152,10 @@ class TimeFrame:
             a tuple containing the UTC offset, start time, end time, normalized start time, and normalized end time.
         """
 
+        # Reuse the formatted attributes if they were already computed.
+        if self._attributes is not None:
+            return self._attributes
+
         # Convert the start/end times to strings.
         start_time = self.start_time.strftime(DATETIME_FORMAT)
         end_time = self.end_time.strftime(DATETIME_FORMAT)
@@ -101,4 +164,6 @@ class TimeFrame:
         norm_start_time = self.norm_start_time.strftime(DATETIME_FORMAT)
         norm_end_time = self.norm_end_time.strftime(DATETIME_FORMAT)
 
-        return self.utc_offset, start_time, end_time, norm_start_time, norm_end_time
+        self._attributes = (self.utc_offset, start_time, end_time, norm_start_time, norm_end_time)
+
+        return self._attributes
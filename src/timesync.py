@@ -1,9 +1,25 @@
+import heapq
+import io
+import os
 import sys
-from datetime import datetime
-
-from timeframe import TimeFrame
-from utils import clear_screen, format_time, format_utc_offset, format_date, is_valid_datetime, is_valid_offset, \
-    generate_timeframe_table, generate_localized_times_table, generate_visualization_table, get_duration_string
+import time
+from bisect import bisect_left, bisect_right, insort
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterable, Tuple
+
+from columns import SessionColumns
+from persistent import Node, PersistentMap, assoc, dissoc, diff
+from timeframe import EPOCH, TimeFrame
+from utils import clear_screen, generate_timeframe_table, generate_localized_times_table, \
+    generate_visualization_table, get_duration_string, localize_by_offset, generate_offset_summary_table, pop_option, \
+    parse_add_arguments, select_weight, parse_datetime_arguments, has_wildcards, select_ids, group_by_offset, \
+    generate_density_table, parse_duration_argument, generate_bottleneck_table, generate_coverage_table, \
+    DENSITY_SHADES, UTC_OFFSET_ORDER
+from window import WindowIndex, intersect_timeframes, analyze_bottlenecks
+
+# The dashboard, export, external, shared and watch modules are imported by the actions that use them, so that they are not
+# loaded before the first prompt.
 
 # Datetime format.
 DATETIME_FORMAT = "%d-%m-%y %H:%M"
@@ -11,9 +27,61 @@ DATETIME_FORMAT = "%d-%m-%y %H:%M"
 # Maximum number of characters in one line that can be used to visualize the timeframes.
 MAX_CHARACTER_LENGTH = 100
 
+# Actions shown as panes of the live dashboard, and the pane each action is shown in.
+LIVE_PANES = {"ls": "ls", "list": "ls", "vis": "vis", "find": "find", "run": "find", "sync": "find"}
+
 # Dict to store the timeframes. Timeframes are stored as {timeframe_id: TimeFrame_object}
 TIMEFRAMES = {}
 
+# Sorted list of the timeframe IDs, kept in step with TIMEFRAMES. Used to select timeframes by ID pattern.
+SORTED_IDS = []
+
+# Dict to index the timeframe IDs by UTC offset. Stored as {utc_offset: {timeframe_id, ...}}
+OFFSET_INDEX = {}
+
+# Index of the normalized start/end times, used to find the common timeframe and visualization span incrementally.
+WINDOW_INDEX = WindowIndex()
+
+# Columns of the UTC offsets and normalized start/end times, kept in the order of TIMEFRAMES for exports.
+SESSION_COLUMNS = SessionColumns()
+
+# Conflict policies of the 'merge' action.
+MERGE_POLICIES = ("overwrite", "keep", "fail", "later-end")
+
+# Shared memory publisher of the session, used by reader processes. None if the session is not shared.
+SHARED_SESSION = None
+
+# Expiry policy. If enabled, timeframes whose normalized end time is before the cutoff are removed before every command.
+# A cutoff of None means the current UTC time.
+EXPIRY_ENABLED = False
+EXPIRY_CUTOFF = None
+
+# Actions that move within the undo history. The expiry policy is not applied before them, so that an undone expiry
+# is shown instead of being expired again at once.
+HISTORY_ACTIONS = {"undo", "redo", "restore"}
+
+# Session version. Incremented on every mutation of TIMEFRAMES.
+SESSION_VERSION = 0
+
+# Persistent copy of TIMEFRAMES, a treap sharing its unchanged nodes with the previous versions.
+SESSION_TREE = None
+
+# Versions of the session for undo/redo, stored as persistent trees, and the position of the current version.
+HISTORY = [None]
+HISTORY_POSITION = 0
+
+# Maximum number of versions kept for undo.
+MAX_HISTORY_LENGTH = 1000
+
+# Named checkpoints of the session. Stored as {name: persistent_tree}
+CHECKPOINTS = {}
+
+# Cache of computed results and rendered tables. Entries are stored as {cache_key: (session_version, result)}
+RESULT_CACHE = {}
+
+# Maximum number of entries in RESULT_CACHE. The oldest entries are dropped first.
+MAX_RESULT_CACHE_SIZE = 256
+
 # Help description.
 HELP_DESCRIPTION = """\
 CLI app to find the longest common timeframe among several timeframes in different timezones.
@@ -22,15 +90,45 @@ Commands:
     add <timeframe-id> <utc-offset> <start-time> <end-time>
              - add a timeframe.
     remove <timeframe-id>
-             - remove a timeframe.
+             - remove a timeframe. A pattern such as eng-* removes all matching timeframes.
 
     see documentation for further usage details.
 
     reset    - clear all timeframes.
-
-    run/find - find the common timeframe.
-    ls       - list all the timeframes.
+    undo / redo
+             - revert or reapply the last change.
+    checkpoint <name> / restore <name>
+             - save the timeframes under a name, or restore them.
+
+    run/find [--by-offset] [--ids <pattern>]
+             - find the common timeframe.
+    ls [<pattern>]
+             - list all the timeframes, or those with IDs matching the pattern.
+    bottleneck [<duration>]
+             - show which timeframes limit the common timeframe, optionally against a target duration.
     vis      - visualize the timeframes.
+    live [ls] [vis] [find] [--fps <n>]
+             - keep the ls/vis/find output on screen, redrawing only the changed rows after each command.
+    vis --density [--by offset|prefix]
+             - visualize how many timeframes overlap, optionally per UTC offset or ID prefix.
+    watch <path>
+             - apply add/remove events from a file as they are appended.
+
+    sweep <path> [--quorum <k>] [--memory-mb <mb>]
+             - overlap statistics of a JSON Lines file too large to load, within a memory budget.
+    merge <path> [--policy overwrite|keep|fail|later-end]
+             - merge the timeframes exported to a file with 'ls --format json|jsonl'.
+
+    share <name> / share off
+             - publish the timeframes to shared memory for reader processes.
+
+    expire [<date> <time>]
+             - remove timeframes that ended before now (or the given UTC time).
+    expire on [<date> <time>] / expire off
+             - automatically remove expired timeframes before every command.
+
+    find, ls and vis accept --format json|jsonl|arrow [--out <path>]
+             - export the output in a machine-readable format.
             
     clear    - clears the screen.
     help     - view the help description.
@@ -38,6 +136,177 @@ Commands:
 """
 
 
+def bump_session_version(record_history: bool = True) -> None:
+    """ Increment the session version. Invalidates every cached result of the previous version.
+
+    Args:
+        record_history (bool): add the new version to the undo history if True. Undo and redo move within the
+                               history instead.
+    """
+
+    global SESSION_VERSION, HISTORY_POSITION
+    SESSION_VERSION += 1
+
+    # Results of the previous version can no longer be used.
+    RESULT_CACHE.clear()
+
+    # Nothing to record if the timeframes did not change.
+    if not record_history or SESSION_TREE is HISTORY[HISTORY_POSITION]:
+        return
+
+    # A new version discards the versions that were undone.
+    del HISTORY[HISTORY_POSITION + 1:]
+    HISTORY.append(SESSION_TREE)
+
+    # Drop the oldest versions. Nodes shared with newer versions are kept alive by them.
+    if len(HISTORY) > MAX_HISTORY_LENGTH:
+        del HISTORY[:len(HISTORY) - MAX_HISTORY_LENGTH]
+
+    HISTORY_POSITION = len(HISTORY) - 1
+
+
+def session_snapshot() -> PersistentMap:
+    """ Get a read-only snapshot of the current timeframes.
+
+    The snapshot is not affected by later changes to the session, and taking it costs O(1).
+
+    Returns:
+        the snapshot, a mapping of {timeframe_id: TimeFrame_object} in order of ID.
+    """
+
+    return PersistentMap(SESSION_TREE)
+
+
+def get_cached_result(cache_key: str | tuple, compute: Callable[[], Any]) -> Any:
+    """ Get a result computed for the current session version, computing it on a cache miss.
+
+    Args:
+        cache_key (str | tuple): key identifying the result.
+        compute (Callable): function that computes the result.
+
+    Returns:
+        the cached result if it was computed for the current session version, else the newly computed result.
+    """
+
+    # Return the cached result if it belongs to the current session version.
+    entry = RESULT_CACHE.get(cache_key)
+    if entry is not None and entry[0] == SESSION_VERSION:
+        return entry[1]
+
+    # Compute the result and cache it against the current session version.
+    result = compute()
+    RESULT_CACHE.pop(cache_key, None)
+    RESULT_CACHE[cache_key] = (SESSION_VERSION, result)
+
+    # Drop the oldest entries, e.g. of ID patterns that are no longer used.
+    while len(RESULT_CACHE) > MAX_RESULT_CACHE_SIZE:
+        del RESULT_CACHE[next(iter(RESULT_CACHE))]
+
+    return result
+
+
+def store_timeframe(timeframe_id: str, timeframe: TimeFrame, update_sorted_ids: bool = True) -> None:
+    """ Store a timeframe in TIMEFRAMES and its indexes, replacing any timeframe with the same ID.
+
+    Args:
+        timeframe_id (str): ID of the timeframe.
+        timeframe (TimeFrame): the timeframe to store.
+        update_sorted_ids (bool): insert a new ID into the sorted ID index if True. Batched insertions update the
+                                  sorted ID index themselves.
+    """
+
+    global SESSION_TREE
+
+    replaced = TIMEFRAMES.get(timeframe_id)
+
+    # Store the timeframe. A replaced timeframe keeps its place in TIMEFRAMES and the sorted ID index.
+    TIMEFRAMES[timeframe_id] = timeframe
+    SESSION_TREE = assoc(SESSION_TREE, timeframe_id, timeframe)
+
+    if replaced is None:
+        if update_sorted_ids:
+            insort(SORTED_IDS, timeframe_id)
+        WINDOW_INDEX.push(timeframe_id, timeframe)
+    else:
+        # Remove the replaced timeframe ID from its offset bucket, dropping the bucket once it is empty.
+        bucket = OFFSET_INDEX[replaced.get_utc_offset()]
+        bucket.discard(timeframe_id)
+        if not bucket:
+            del OFFSET_INDEX[replaced.get_utc_offset()]
+        WINDOW_INDEX.replace(timeframe_id, timeframe, TIMEFRAMES)
+
+    OFFSET_INDEX.setdefault(timeframe.get_utc_offset(), set()).add(timeframe_id)
+    SESSION_COLUMNS.set(timeframe_id, timeframe)
+
+    if SHARED_SESSION is not None:
+        SHARED_SESSION.set(timeframe_id, timeframe)
+
+
+def discard_timeframe(timeframe_id: str, update_sorted_ids: bool = True) -> TimeFrame:
+    """ Remove a timeframe from TIMEFRAMES and its indexes.
+
+    Args:
+        timeframe_id (str): ID of an existing timeframe.
+        update_sorted_ids (bool): remove the ID from the sorted ID index if True. Batched removals update the sorted
+                                  ID index themselves.
+
+    Returns:
+        the removed timeframe.
+    """
+
+    global SESSION_TREE
+
+    timeframe = TIMEFRAMES.pop(timeframe_id)
+    SESSION_TREE = dissoc(SESSION_TREE, timeframe_id)
+
+    # Remove the timeframe ID from the sorted ID index.
+    if update_sorted_ids:
+        del SORTED_IDS[bisect_left(SORTED_IDS, timeframe_id)]
+
+    # Remove the timeframe ID from its offset bucket, dropping the bucket once it is empty.
+    bucket = OFFSET_INDEX[timeframe.get_utc_offset()]
+    bucket.discard(timeframe_id)
+    if not bucket:
+        del OFFSET_INDEX[timeframe.get_utc_offset()]
+
+    WINDOW_INDEX.discard(TIMEFRAMES)
+    SESSION_COLUMNS.remove(timeframe_id)
+
+    if SHARED_SESSION is not None:
+        SHARED_SESSION.remove(timeframe_id)
+
+    return timeframe
+
+
+def clear_timeframes() -> None:
+    """ Remove all timeframes from TIMEFRAMES and its indexes. """
+
+    global SESSION_TREE
+
+    TIMEFRAMES.clear()
+    SESSION_TREE = None
+    SORTED_IDS.clear()
+    OFFSET_INDEX.clear()
+    WINDOW_INDEX.clear()
+    SESSION_COLUMNS.clear()
+
+    if SHARED_SESSION is not None:
+        SHARED_SESSION.clear()
+
+
+def select_timeframes(id_pattern: str) -> dict:
+    """ Select the timeframes with IDs matching a glob pattern.
+
+    Args:
+        id_pattern (str): the glob pattern, e.g. "eng-*".
+
+    Returns:
+        a dict of the matching timeframes in order of ID, stored as {timeframe_id: TimeFrame_object}.
+    """
+
+    return {timeframe_id: TIMEFRAMES[timeframe_id] for timeframe_id in select_ids(SORTED_IDS, id_pattern)}
+
+
 def add_timeframe(timeframe_id: str, utc_offset: str, start_time: datetime, end_time: datetime) -> None:
     """ Add a new timeframe to TimeSync.
 
@@ -67,44 +336,156 @@ def add_timeframe(timeframe_id: str, utc_offset: str, start_time: datetime, end_
     new_timeframe = TimeFrame(utc_offset, start_time, end_time)
 
     # Add the new timeframe to the "timeframes" dictionary.
-    TIMEFRAMES[timeframe_id] = new_timeframe
+    store_timeframe(timeframe_id, new_timeframe)
+    bump_session_version()
 
     # Print success message.
     print("Timeframe added.\n")
 
 
-def find_common_timeframe() -> None:
-    """ Finds the longest common timeframe within the provided timeframes and prints the output. """
+def compute_common_timeframe() -> Tuple[datetime, datetime] | None:
+    """ Computes the longest common timeframe within the provided timeframes.
+
+    Returns:
+        a tuple of the normalized (start, end) times of the common timeframe, or None if it does not exist.
+    """
+
+    # Get the latest normalized start time and earliest normalized end time from the window index.
+    latest_start_time, earliest_end_time = WINDOW_INDEX.common_window(TIMEFRAMES)
+
+    """
+    NOTE: If the latest start time >= the earliest end time, a common timeframe does not exist.
+    """
+
+    # Common timeframe does not exist.
+    if latest_start_time >= earliest_end_time:
+        return None
+
+    return latest_start_time, earliest_end_time
+
+
+def parse_export_options(command: list) -> Tuple[str | None, str | None]:
+    """ Parse and remove the export options "--format" and "--out" from a command.
+
+    Args:
+        command (list): the split command. The export options are removed in place.
+
+    Returns:
+        a tuple (export_format, output_path). export_format is None if no export was requested.
+    """
+
+    export_format = pop_option(command, "--format")
+    output_path = pop_option(command, "--out")
+
+    if export_format is None:
+        if output_path is not None:
+            raise ValueError("option --out requires --format.")
+        return None, None
+
+    from export import EXPORT_FORMATS
 
-    # Create a list containing just the timeframe objects (the value attributes) from the TIMEFRAMES dictionary.
-    timeframes = list(TIMEFRAMES.values())
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"unsupported format \"{export_format}\". Expected one of: {', '.join(EXPORT_FORMATS)}.")
 
-    # Initialize (latest_start_time, earliest_end_time) as the normalized (start, end) times of the 0th timeframe.
-    latest_start_time, earliest_end_time = timeframes[0].get_norm_times()
+    # Arrow output is binary and must be written to a file.
+    if export_format == "arrow" and output_path is None:
+        raise ValueError("arrow format requires --out <path>.")
 
-    # Looping through every timeframe to find the latest normalized start time and earliest normalized end time.
-    for timeframe in timeframes[1:]:
-        # Get the normalized start and end times for the TimeFrame object.
-        norm_start, norm_end = timeframe.get_norm_times()
+    return export_format, output_path
 
-        # Assign the current timeframe's normalized start time to latest_start_time if it is later.
-        if norm_start > latest_start_time:
-            latest_start_time = norm_start
 
-        # Assign the current timeframe's normalized end time to earliest_end_time if it is earlier.
-        if norm_end < earliest_end_time:
-            earliest_end_time = norm_end
+def session_columns(timeframes: dict) -> dict | None:
+    """ Get the maintained columns of the timeframes for an export.
 
+    Args:
+        timeframes (dict): timeframes to export.
+
+    Returns:
+        the columns of the session if the timeframes are the whole session, else None. Columns of a selection are
+        built by the export.
     """
-    NOTE: If the latest start time >= the earliest end time, a common timeframe does not exist.
+
+    return SESSION_COLUMNS.columns() if timeframes is TIMEFRAMES else None
+
+
+def print_export(action: str, export: Callable[[], str | None], output_path: str | None) -> None:
+    """ Run an export and print its output, or where it was written to.
+
+    Args:
+        action (str): name of the action, used in error messages.
+        export (Callable): function that performs the export.
+        output_path (str): path of the output file, or None to print the output.
+    """
+
+    try:
+        output = export()
+    except (ImportError, OSError) as error:
+        print(f"{action}: {error}\n")
+        return
+
+    if output_path is None:
+        print(output)
+    else:
+        print(f"Output written to \"{output_path}\".\n")
+
+
+def find_common_timeframe(by_offset: bool = False, export_format: str = None, output_path: str = None,
+                          id_pattern: str = None) -> None:
+    """ Finds the longest common timeframe within the provided timeframes and prints the output.
+
+    Args:
+        by_offset (bool): print the localized times grouped by UTC offset instead of per timeframe if True.
+        export_format (str): export the output as "json", "jsonl" or "arrow" instead of printing tables. Optional.
+        output_path (str): path to write the exported output to. Optional.
+        id_pattern (str): only include the timeframes with IDs matching this glob pattern. Optional.
     """
 
+    # Select the timeframes, reusing the results if the session is unchanged.
+    if id_pattern is None:
+        timeframes, offset_index = TIMEFRAMES, OFFSET_INDEX
+    else:
+        timeframes = get_cached_result(("selection", id_pattern), lambda: select_timeframes(id_pattern))
+        offset_index = get_cached_result(("offset_index", id_pattern), lambda: group_by_offset(timeframes))
+
+    # Ensure there are more than 1 timeframes provided.
+    if len(timeframes) <= 1:
+        print(f"\nfind: {len(timeframes)} timeframe(s) provided."
+              "\n      Provide at least 2 timeframes to find a common timeframe.")
+        return
+
+    # Get the common timeframe, reusing the result if the session is unchanged.
+    if id_pattern is None:
+        common_timeframe = get_cached_result("common_timeframe", compute_common_timeframe)
+    else:
+        common_timeframe = get_cached_result(
+            ("common_timeframe", id_pattern), lambda: intersect_timeframes(timeframes.values())
+        )
+
+    # Export the common timeframe in a machine-readable format.
+    if export_format is not None:
+        from export import export_common_timeframe
+
+        def export():
+            localized_times = None
+            if common_timeframe is not None:
+                localized_times = get_cached_result(
+                    ("localized_times", id_pattern),
+                    lambda: localize_by_offset(offset_index, timeframes, common_timeframe)
+                )
+            return export_common_timeframe(timeframes, common_timeframe, localized_times, export_format, output_path,
+                                           columns=session_columns(timeframes))
+
+        print_export("find", export, output_path)
+        return
+
     # Common timeframe does not exist.
-    if latest_start_time >= earliest_end_time:
+    if common_timeframe is None:
         print("No common timeframe found among the timeframes provided.\n")
 
     # A common timeframe exists.
     else:
+        latest_start_time, earliest_end_time = common_timeframe
+
         """ Building the Duration string """
         # Get the duration in seconds from the timedelta object. Then divide by 60 to convert it to minutes.
         duration = (earliest_end_time - latest_start_time).seconds // 60
@@ -113,9 +494,22 @@ def find_common_timeframe() -> None:
         duration_str = get_duration_string(duration)
 
         """ Generating the Table of Localized Times """
-        # Get the table of localized times.
-        common_timeframe = (latest_start_time, earliest_end_time)
-        localized_table = generate_localized_times_table(TIMEFRAMES, common_timeframe)
+        # Localize the common timeframe once per distinct UTC offset.
+        localized_times = get_cached_result(
+            ("localized_times", id_pattern), lambda: localize_by_offset(offset_index, timeframes, common_timeframe)
+        )
+
+        # Get the table of localized times, either grouped by UTC offset or per timeframe.
+        if by_offset:
+            localized_table = get_cached_result(
+                ("offset_summary_table", id_pattern),
+                lambda: generate_offset_summary_table(offset_index, localized_times)
+            )
+        else:
+            localized_table = get_cached_result(
+                ("localized_table", id_pattern),
+                lambda: generate_localized_times_table(timeframes, common_timeframe, localized_times)
+            )
 
         """ Printing outputs """
         # Convert the datetime objects to strings.
@@ -132,54 +526,110 @@ def find_common_timeframe() -> None:
         print(localized_table)
 
 
-def visualize_timeframes():
-    """ Visualize the timeframes side-by-side to see how they overlap. """
+def find_bottlenecks(target_minutes: int = None) -> None:
+    """ Finds the timeframes that limit the common timeframe and prints how much it grows without each of them.
 
-    # Create a list containing just the timeframe objects (the value attributes) from the TIMEFRAMES dictionary.
-    timeframes = list(TIMEFRAMES.values())
+    Args:
+        target_minutes (int): target duration of the common timeframe in minutes. If given, the smallest extension of
+                              each limiting timeframe that reaches it is printed as well. Optional.
+    """
 
-    # Initialize (earliest_start_time, latest_end_time) as the normalized (start, end) times of the 0th timeframe.
-    earliest_start_time, latest_end_time = timeframes[0].get_norm_times()
+    # Ensure there are more than 1 timeframes provided.
+    if len(TIMEFRAMES) <= 1:
+        print(f"\nbottleneck: {len(TIMEFRAMES)} timeframe(s) provided."
+              "\n            Provide at least 2 timeframes to find the bottlenecks.")
+        return
 
-    # Looping through every timeframe to find the latest normalized start time and earliest normalized end time.
-    for timeframe in timeframes[1:]:
-        # Get the normalized start and end times for the TimeFrame object.
-        norm_start, norm_end = timeframe.get_norm_times()
+    # Analyze the timeframes, reusing the result if the session is unchanged.
+    target_seconds = target_minutes * 60 if target_minutes is not None else None
+    analysis = get_cached_result(("bottleneck", target_seconds), lambda: analyze_bottlenecks(TIMEFRAMES, target_seconds))
 
-        # Assign the current timeframe's normalized start time to earliest_start_time if it is earlier.
-        if norm_start < earliest_start_time:
-            earliest_start_time = norm_start
+    start_epoch, end_epoch = analysis["window"]
+    duration = (end_epoch - start_epoch) // 60
 
-        # Assign the current timeframe's normalized end time to latest_end_time if it is later.
-        if norm_end > latest_end_time:
-            latest_end_time = norm_end
+    # Print the common timeframe, or the gap between the latest start time and the earliest end time.
+    if duration > 0:
+        start_time = datetime.strftime(EPOCH + timedelta(seconds=start_epoch), DATETIME_FORMAT)
+        end_time = datetime.strftime(EPOCH + timedelta(seconds=end_epoch), DATETIME_FORMAT)
+        print(f"Common timeframe : {start_time} UTC - {end_time} UTC ({get_duration_string(duration).strip()})")
+    else:
+        print(f"No common timeframe. Gap: {get_duration_string(-duration).strip() or '0 minutes'}")
+
+    # Print how far the common timeframe is from the target duration.
+    if target_minutes is not None:
+        shortfall = target_minutes - max(duration, 0)
+        print(f"Target duration  : {get_duration_string(target_minutes).strip() or '0 minutes'} "
+              f"({'reached' if shortfall <= 0 else get_duration_string(shortfall).strip() + ' short'})")
+
+    # Print the table of limiting timeframes.
+    print(f"\n{len(analysis['bottlenecks'])} of {len(TIMEFRAMES)} timeframes limit the common timeframe.\n")
+    print(generate_bottleneck_table(analysis["bottlenecks"], with_target=target_minutes is not None))
+
+
+def compute_visualization_span() -> Tuple[datetime, int] | None:
+    """ Computes the earliest normalized start time and the weight used to visualize the timeframes.
+
+    Returns:
+        a tuple (earliest_start_time, weight), or None if there are no timeframes or the duration is too large to
+        visualize.
+    """
 
-    # Find the difference between the earliest start time and the latest end time and convert it to minutes.
-    difference = (latest_end_time - earliest_start_time).seconds // 60
+    # Get the earliest normalized start time and latest normalized end time from the window index.
+    span = WINDOW_INDEX.span(TIMEFRAMES)
+    if span is None:
+        return None
+
+    earliest_start_time, latest_end_time = span
+
+    # Find the difference between the earliest start time and the latest end time in minutes, including whole days, so
+    # that the weight covers the same span as the visualization.
+    difference = (latest_end_time - earliest_start_time) // timedelta(minutes=1)
 
     # If the difference is too large to visualize on screen, skip visualization.
     # Difference cannot be longer than N number of days, where N = MAX_CHARACTER_LENGTH.
     if difference > MAX_CHARACTER_LENGTH * 24 * 60:
+        return None
+
+    # Select the number of minutes represented by one character.
+    weight = select_weight(difference, MAX_CHARACTER_LENGTH)
+
+    return earliest_start_time, weight
+
+
+def visualize_timeframes(export_format: str = None, output_path: str = None) -> None:
+    """ Visualize the timeframes side-by-side to see how they overlap.
+
+    Args:
+        export_format (str): export the output as "json", "jsonl" or "arrow" instead of printing a table. Optional.
+        output_path (str): path to write the exported output to. Optional.
+    """
+
+    # Nothing to visualize.
+    if not TIMEFRAMES:
+        print("vis: No timeframes to visualize.\n")
+        return
+
+    # Get the visualization span, reusing the result if the session is unchanged.
+    span = get_cached_result("visualization_span", compute_visualization_span)
+
+    # Duration is too large to visualize.
+    if span is None:
         print("vis: cannot print visualization, duration too large.")
         return
 
-    # Initialize weight to None.
-    weight = None
-    # Smaller weights.
-    weights = [1, 5, 10, 15, 20, 25, 30, 45]
+    earliest_start_time, weight = span
 
-    # Check if any of the smaller weights are suitable.
-    for wt in weights:
-        if difference / wt < MAX_CHARACTER_LENGTH:
-            weight = wt
-            break
+    # Export the visualization in a machine-readable format.
+    if export_format is not None:
+        from export import export_visualization
 
-    # If none of the smaller weights were suitable, look for suitable weight in multiples of 30. (1, 1.5, 2, 2.5 hours)
-    if weight is None:
-        for multiplier in range(2, 50):
-            weight = 30 * multiplier
-            if difference / weight < MAX_CHARACTER_LENGTH:
-                break
+        print_export(
+            "vis",
+            lambda: export_visualization(TIMEFRAMES, weight, earliest_start_time, export_format, output_path,
+                                         columns=session_columns(TIMEFRAMES)),
+            output_path
+        )
+        return
 
     """ Get the duration string """
     weight_str = get_duration_string(weight)
@@ -189,10 +639,246 @@ def visualize_timeframes():
     print(f"| = {weight_str}\n")
 
     # Generate and print the visualization table.
-    vis_table = generate_visualization_table(TIMEFRAMES, weight, earliest_start_time)
+    vis_table = get_cached_result(
+        "visualization_table", lambda: generate_visualization_table(TIMEFRAMES, weight, earliest_start_time)
+    )
     print(vis_table)
 
 
+def group_timeframes(group_by: str | None) -> dict:
+    """ Group the timeframes for the density visualization.
+
+    Args:
+        group_by (str): "offset" to group by UTC offset, "prefix" to group by ID prefix (the ID up to its last "-"),
+                        or None for a single group of all timeframes.
+
+    Returns:
+        the groups of timeframes, stored as {group_name: [TimeFrame_object, ...]}.
+    """
+
+    if group_by is None:
+        return {"All": list(TIMEFRAMES.values())}
+
+    if group_by == "offset":
+        return {
+            utc_offset: [TIMEFRAMES[timeframe_id] for timeframe_id in OFFSET_INDEX[utc_offset]]
+            for utc_offset in sorted(OFFSET_INDEX, key=UTC_OFFSET_ORDER.__getitem__)
+        }
+
+    # Group by ID prefix. The sorted ID index keeps the members of a prefix group adjacent.
+    groups = {}
+    for timeframe_id in SORTED_IDS:
+        groups.setdefault(timeframe_id.rpartition("-")[0] or timeframe_id, []).append(TIMEFRAMES[timeframe_id])
+
+    return groups
+
+
+def visualize_density(group_by: str = None) -> None:
+    """ Visualize how many timeframes overlap over the span of all timeframes, as one shaded strip per group.
+
+    Args:
+        group_by (str): "offset" or "prefix" to print one strip per UTC offset or ID prefix. Optional.
+    """
+
+    # Nothing to visualize.
+    if not TIMEFRAMES:
+        print("vis: No timeframes to visualize.\n")
+        return
+
+    # Get the visualization span, reusing the result if the session is unchanged.
+    span = get_cached_result("visualization_span", compute_visualization_span)
+
+    # Duration is too large to visualize.
+    if span is None:
+        print("vis: cannot print visualization, duration too large.")
+        return
+
+    earliest_start_time, weight = span
+
+    # Number of characters needed to cover the span of all timeframes.
+    latest_end_time = WINDOW_INDEX.span(TIMEFRAMES)[1]
+    num_slots = -(-(latest_end_time - earliest_start_time) // timedelta(minutes=weight))
+
+    """ Printing the Visualization """
+    # Print legend.
+    shades = " ".join(DENSITY_SHADES[1:])
+    print(f"1 character = {get_duration_string(weight)}, shades {shades} = up to 25%, 50%, 75%, 100% of the group\n")
+
+    # Generate and print the density table.
+    density_table = get_cached_result(
+        ("density_table", group_by),
+        lambda: generate_density_table(group_timeframes(group_by), weight, earliest_start_time, num_slots)
+    )
+    print(density_table)
+
+
+def current_common_timeframe() -> Tuple[datetime, datetime] | None:
+    """ Get the common timeframe of the current session.
+
+    Returns:
+        the normalized (start, end) times of the common timeframe, or None if it does not exist or fewer than 2
+        timeframes are stored.
+    """
+
+    if len(TIMEFRAMES) <= 1:
+        return None
+
+    return get_cached_result("common_timeframe", compute_common_timeframe)
+
+
+def describe_common_timeframe(common_timeframe: Tuple[datetime, datetime] | None) -> str:
+    """ Describe a common timeframe in one line.
+
+    Args:
+        common_timeframe (tuple): the normalized (start, end) times of the common timeframe, or None.
+
+    Returns:
+        the start/end times and duration of the common timeframe as a string.
+    """
+
+    if common_timeframe is None:
+        return "none"
+
+    start_time, end_time = common_timeframe
+    duration_str = get_duration_string((end_time - start_time) // timedelta(minutes=1))
+
+    return f"{start_time.strftime(DATETIME_FORMAT)} - {end_time.strftime(DATETIME_FORMAT)} UTC ({duration_str})"
+
+
+def apply_event(command: list) -> str:
+    """ Apply an add/remove event of an availability feed to the session. Existing timeframes are overwritten.
+
+    Args:
+        command (list): the split event command.
+
+    Returns:
+        the changed timeframe row as a string.
+    """
+
+    if command[0] == "add":
+        # Parse the event arguments with the same rules as the 'add' command.
+        try:
+            timeframe_id, utc_offset, start_time, end_time = parse_add_arguments(command)
+        except ValueError as ve:
+            raise ValueError(str(ve).strip()) from None
+
+        timeframe = TimeFrame(utc_offset, start_time, end_time)
+        store_timeframe(timeframe_id, timeframe)
+        bump_session_version()
+
+        # Only the added timeframe's row is formatted.
+        return f"+ {timeframe_id} | {' | '.join(timeframe.get_attributes())}"
+
+    else:
+        timeframe_id = command[1]
+
+        if timeframe_id not in TIMEFRAMES:
+            raise ValueError(f"remove: Timeframe with the ID \"{timeframe_id}\" does not exist.")
+
+        discard_timeframe(timeframe_id)
+        bump_session_version()
+
+        return f"- {timeframe_id}"
+
+
+def watch_feed(path: str) -> None:
+    """ Follow an availability feed file and apply its events as they are appended.
+
+    After each event, the changed timeframe row is printed, along with the new common timeframe if it changed and
+    the time taken to process the event.
+
+    Args:
+        path (str): path of the feed file.
+    """
+
+    from watch import follow_lines, parse_event
+
+    print(f"Watching \"{path}\". Press Ctrl+C to stop.\n")
+
+    # Common timeframe before the next event.
+    previous_common_timeframe = current_common_timeframe()
+
+    try:
+        for line in follow_lines(path):
+            # Time at which the event was read.
+            started = time.perf_counter()
+
+            # Parse and apply the event.
+            try:
+                command = parse_event(line)
+                if command is None:
+                    continue
+
+                row = apply_event(command)
+            except ValueError as ve:
+                print(f"watch: {ve}")
+                continue
+
+            # Print the changed row, and the common timeframe if it changed.
+            output = row
+            common_timeframe = current_common_timeframe()
+            if common_timeframe != previous_common_timeframe:
+                output += f"\n  common timeframe: {describe_common_timeframe(common_timeframe)}"
+                previous_common_timeframe = common_timeframe
+
+            latency = (time.perf_counter() - started) * 1000
+            print(f"{output}\n  ({latency:.2f} ms)")
+
+    except KeyboardInterrupt:
+        print("\nwatch: stopped.\n")
+
+    except OSError as error:
+        print(f"watch: {error}\n")
+
+
+def expire_timeframes(cutoff: datetime = None) -> int:
+    """ Remove the timeframes whose normalized end time is before the cutoff.
+
+    Timeframes are popped from the window index in order of normalized end time, so a sweep costs O(log n) per
+    removed timeframe.
+
+    Args:
+        cutoff (datetime): normalized (UTC +00:00) cutoff time. Defaults to the current UTC time.
+
+    Returns:
+        the number of removed timeframes.
+    """
+
+    if cutoff is None:
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    # Number of removed timeframes.
+    count = 0
+
+    while True:
+        entry = WINDOW_INDEX.earliest_ending(TIMEFRAMES)
+
+        # Stop at the first timeframe that has not expired.
+        if entry is None or entry[1].norm_end_time >= cutoff:
+            break
+
+        discard_timeframe(entry[0])
+        count += 1
+
+    if count > 0:
+        bump_session_version()
+
+    return count
+
+
+def remove_expired_timeframes(action: str) -> None:
+    """ Remove the expired timeframes before a command if the expiry policy is enabled.
+
+    Args:
+        action (str): action of the command. Nothing is removed before the actions in HISTORY_ACTIONS.
+    """
+
+    if EXPIRY_ENABLED and action not in HISTORY_ACTIONS:
+        expired_count = expire_timeframes(EXPIRY_CUTOFF)
+        if expired_count > 0:
+            print(f"expire: {expired_count} expired timeframe(s) removed.\n")
+
+
 def remove_timeframe(timeframe_id: str) -> bool:
     """ Remove a timeframe from TimeSync.
 
@@ -209,11 +895,243 @@ def remove_timeframe(timeframe_id: str) -> bool:
         return False
 
     # Remove the timeframe if all validation checks are passed.
-    TIMEFRAMES.pop(timeframe_id)
+    discard_timeframe(timeframe_id)
+    bump_session_version()
     print(f"Timeframe \"{timeframe_id}\" removed.")
     return True
 
 
+def share_session(name: str | None) -> None:
+    """ Publish the session to shared memory, or stop publishing it.
+
+    While the session is shared, every add/remove is applied to the shared columns. Reader processes attach with
+    shared.SharedSessionReader(name).
+
+    Args:
+        name (str): name of the shared memory block, or None to stop sharing.
+    """
+
+    global SHARED_SESSION
+
+    # Stop sharing the current session.
+    if SHARED_SESSION is not None:
+        SHARED_SESSION.close()
+        SHARED_SESSION = None
+        print("Stopped sharing the session.\n")
+
+    if name is None:
+        return
+
+    from shared import SharedSessionWriter
+
+    try:
+        shared_session = SharedSessionWriter(name, capacity=max(1024, 2 * len(TIMEFRAMES)))
+    except (OSError, ValueError) as error:
+        print(f"share: {error}\n")
+        return
+
+    shared_session.publish(TIMEFRAMES)
+    SHARED_SESSION = shared_session
+
+    print(f"Session shared as \"{name}\".\n")
+
+
+def merge_timeframes(batch: dict | Iterable[Tuple[str, TimeFrame]], policy: str = "fail") -> dict:
+    """ Merge a batch of timeframes into the session without prompting.
+
+    The batch is joined with the sorted ID index in a single sorted-merge pass, O(n + m). IDs that exist in both
+    are resolved by the conflict policy:
+        overwrite - replace the stored timeframe.
+        keep      - keep the stored timeframe.
+        fail      - abort the merge without any changes if any ID exists.
+        later-end - keep whichever timeframe has the later normalized end time.
+
+    Args:
+        batch (dict | Iterable[tuple]): another session's timeframes as {timeframe_id: TimeFrame_object}, or
+                                        (timeframe_id, TimeFrame_object) pairs sorted by ID.
+        policy (str): the conflict policy.
+
+    Returns:
+        a summary of the merge, stored as {"inserted": count, "updated": count, "skipped": count}.
+    """
+
+    if policy not in MERGE_POLICIES:
+        raise ValueError(f"unsupported policy \"{policy}\". Expected one of: {', '.join(MERGE_POLICIES)}.")
+
+    # Sort another session's timeframes by ID.
+    if isinstance(batch, dict):
+        batch = sorted(batch.items(), key=lambda item: item[0])
+
+    # Timeframes to insert and update, and IDs that exist in both.
+    inserts = []
+    updates = []
+    conflicts = []
+    skipped = 0
+
+    # Sorted-merge join of the batch with the sorted ID index.
+    index = 0
+    previous_id = None
+    for timeframe_id, timeframe in batch:
+        if previous_id is not None and timeframe_id <= previous_id:
+            raise ValueError(f"batch is not sorted by unique ID at \"{timeframe_id}\".")
+        previous_id = timeframe_id
+
+        # Advance the session cursor to the first ID not before the batch ID.
+        while index < len(SORTED_IDS) and SORTED_IDS[index] < timeframe_id:
+            index += 1
+
+        # New ID.
+        if index == len(SORTED_IDS) or SORTED_IDS[index] != timeframe_id:
+            inserts.append((timeframe_id, timeframe))
+            continue
+
+        # Existing ID. Resolve the conflict with the policy.
+        if policy == "fail":
+            conflicts.append(timeframe_id)
+        elif policy == "overwrite":
+            updates.append((timeframe_id, timeframe))
+        elif policy == "later-end" and timeframe.norm_end_time > TIMEFRAMES[timeframe_id].norm_end_time:
+            updates.append((timeframe_id, timeframe))
+        else:
+            skipped += 1
+
+    # Abort before applying any change.
+    if conflicts:
+        raise ValueError(f"{len(conflicts)} timeframe ID(s) already exist, e.g. \"{conflicts[0]}\".")
+
+    # Apply the changes. New IDs are merged into the sorted ID index in one pass.
+    for timeframe_id, timeframe in updates:
+        store_timeframe(timeframe_id, timeframe)
+
+    for timeframe_id, timeframe in inserts:
+        store_timeframe(timeframe_id, timeframe, update_sorted_ids=False)
+
+    if inserts:
+        SORTED_IDS[:] = heapq.merge(SORTED_IDS, (timeframe_id for timeframe_id, _ in inserts))
+
+    if inserts or updates:
+        bump_session_version()
+
+    return {"inserted": len(inserts), "updated": len(updates), "skipped": skipped}
+
+
+def merge_file(path: str, policy: str) -> None:
+    """ Merge the timeframes of a JSON or JSON Lines file exported with 'ls --format' and print a summary.
+
+    Args:
+        path (str): path of the file.
+        policy (str): the conflict policy. See merge_timeframes().
+    """
+
+    from export import read_timeframes
+
+    try:
+        batch = read_timeframes(path)
+        summary = merge_timeframes(batch, policy)
+    except (OSError, ValueError, KeyError) as error:
+        print(f"merge: {error}\n")
+        return
+
+    print(f"Merged {len(batch)} timeframe(s): {summary['inserted']} inserted, {summary['updated']} updated, "
+          f"{summary['skipped']} skipped.\n")
+
+
+def sweep_timeframes(path: str, quorum: int = None, memory_mb: int = 256) -> None:
+    """ Compute overlap statistics of a JSON Lines file of timeframes too large to store in the session, and print them.
+
+    The timeframes are not added to the session.
+
+    Args:
+        path (str): path of the file, e.g. exported with 'ls --format jsonl'.
+        quorum (int): minimum number of timeframes covering a quorum window. Defaults to all timeframes.
+        memory_mb (int): memory budget in megabytes.
+    """
+
+    from external import sweep_file
+
+    # Phase shown on the current progress line, or None before the first progress report.
+    current_phase = None
+
+    def report_progress(phase: str, done: int, total: int) -> None:
+        nonlocal current_phase
+
+        # End the line of the previous phase, so that each phase is shown on its own line.
+        if current_phase is not None and phase != current_phase:
+            print()
+        current_phase = phase
+
+        # Overwrite the progress line of the phase in place.
+        if phase == "read":
+            print(f"\rReading: {done:,} timeframe(s) sorted.", end="", flush=True)
+        else:
+            print(f"\rSweeping: {done / total if total else 1:.0%}", end="", flush=True)
+
+    try:
+        statistics = sweep_file(path, quorum=quorum, memory_mb=memory_mb, progress=report_progress)
+    except (OSError, ValueError, KeyError) as error:
+        print(f"\nsweep: {error}\n")
+        return
+
+    # End the last progress line.
+    if current_phase is not None:
+        print("\n")
+
+    def describe_window(window: Tuple[datetime, datetime] | None) -> str:
+        # Describe a window as its normalized start/end times and duration.
+        if window is None:
+            return "none"
+        start_time, end_time = window
+        return f"{start_time.strftime(DATETIME_FORMAT)} UTC - {end_time.strftime(DATETIME_FORMAT)} UTC " \
+               f"({get_duration_string((end_time - start_time) // timedelta(minutes=1)).strip()})"
+
+    print(f"Timeframes        : {statistics['records']:,}"
+          f"\nPeak overlap      : {statistics['peak']:,}"
+          f"\nCommon timeframe  : {describe_window(statistics['common_window'])}"
+          f"\nQuorum            : {statistics['quorum']:,} timeframe(s)"
+          f"\nQuorum windows    : {statistics['quorum_windows']:,}"
+          f"\nLongest window    : {describe_window(statistics['longest_quorum_window'])}\n")
+
+    # No time is covered, e.g. the file is empty or every timeframe has zero length.
+    if not any(statistics["histogram"].values()):
+        print("No coverage to show: the timeframes do not cover any time.\n")
+        return
+
+    print(generate_coverage_table(statistics["histogram"]))
+
+
+def remove_timeframes(id_pattern: str) -> int:
+    """ Remove all timeframes with IDs matching a glob pattern as a single batch.
+
+    Args:
+        id_pattern (str): the glob pattern, e.g. "eng-berlin-*".
+
+    Returns:
+        the number of removed timeframes.
+    """
+
+    # Select the matching IDs from the sorted ID index.
+    timeframe_ids = select_ids(SORTED_IDS, id_pattern)
+
+    if not timeframe_ids:
+        print(f"remove: No timeframes match \"{id_pattern}\".\n")
+        return 0
+
+    # Remove the timeframes from TIMEFRAMES and the other indexes.
+    for timeframe_id in timeframe_ids:
+        discard_timeframe(timeframe_id, update_sorted_ids=False)
+
+    # The selected IDs are a sorted run of the sorted ID index, so they are removed from it with one slice assignment.
+    removed_ids = set(timeframe_ids)
+    low = bisect_left(SORTED_IDS, timeframe_ids[0])
+    high = bisect_right(SORTED_IDS, timeframe_ids[-1])
+    SORTED_IDS[low:high] = [timeframe_id for timeframe_id in SORTED_IDS[low:high] if timeframe_id not in removed_ids]
+
+    bump_session_version()
+    print(f"{len(timeframe_ids)} timeframe(s) removed.")
+
+    return len(timeframe_ids)
+
+
 def reset() -> bool:
     """ Clears all stored timeframes.
 
@@ -227,7 +1145,8 @@ def reset() -> bool:
 
     if response.lower() in {"y", "yes"}:
         # Clearing all values in TIMEFRAMES.
-        TIMEFRAMES.clear()
+        clear_timeframes()
+        bump_session_version()
         print("Removed all timeframes.\n")
         return True
 
@@ -235,11 +1154,121 @@ def reset() -> bool:
         return False
 
 
-def list_timeframes() -> None:
-    """ Prints a table of UTC offsets, start/end times and normalized start/end times of the timeframes. """
+def apply_version(tree: Node | None) -> int:
+    """ Change the session to another version, applying only the timeframes that differ from the current version.
+
+    Args:
+        tree (Node): root of the persistent tree of the version.
+
+    Returns:
+        the number of changed timeframes.
+    """
+
+    global SESSION_TREE
+
+    # Find the changes first: storing and discarding timeframes replaces SESSION_TREE.
+    changes = list(diff(SESSION_TREE, tree))
+
+    for timeframe_id, _, timeframe in changes:
+        if timeframe is None:
+            discard_timeframe(timeframe_id)
+        else:
+            store_timeframe(timeframe_id, timeframe)
+
+    # Reuse the version's tree, so it keeps sharing its nodes with the other versions.
+    SESSION_TREE = tree
+
+    return len(changes)
+
+
+def undo() -> None:
+    """ Revert the session to the version before the last change. """
+
+    global HISTORY_POSITION
+
+    if HISTORY_POSITION == 0:
+        print("undo: Nothing to undo.\n")
+        return
+
+    HISTORY_POSITION -= 1
+    changed_count = apply_version(HISTORY[HISTORY_POSITION])
+    bump_session_version(record_history=False)
+
+    print(f"Undone. {changed_count} timeframe(s) changed.\n")
+
 
-    # Creating the timeframes table as a multiline string.
-    timeframes_table = generate_timeframe_table(TIMEFRAMES)
+def redo() -> None:
+    """ Reapply the last undone change. """
+
+    global HISTORY_POSITION
+
+    if HISTORY_POSITION == len(HISTORY) - 1:
+        print("redo: Nothing to redo.\n")
+        return
+
+    HISTORY_POSITION += 1
+    changed_count = apply_version(HISTORY[HISTORY_POSITION])
+    bump_session_version(record_history=False)
+
+    print(f"Redone. {changed_count} timeframe(s) changed.\n")
+
+
+def create_checkpoint(name: str) -> None:
+    """ Save the current timeframes under a name. Costs O(1), since the versions share their nodes.
+
+    Args:
+        name (str): name of the checkpoint. An existing checkpoint with the same name is replaced.
+    """
+
+    CHECKPOINTS[name] = SESSION_TREE
+    print(f"Checkpoint \"{name}\" saved with {len(TIMEFRAMES)} timeframe(s).\n")
+
+
+def restore_checkpoint(name: str) -> None:
+    """ Restore the timeframes saved under a name. The restore itself can be undone.
+
+    Args:
+        name (str): name of the checkpoint.
+    """
+
+    if name not in CHECKPOINTS:
+        print(f"restore: Checkpoint \"{name}\" does not exist.\n")
+        return
+
+    changed_count = apply_version(CHECKPOINTS[name])
+    bump_session_version()
+
+    print(f"Checkpoint \"{name}\" restored. {changed_count} timeframe(s) changed.\n")
+
+
+def list_timeframes(export_format: str = None, output_path: str = None, id_pattern: str = None) -> None:
+    """ Prints a table of UTC offsets, start/end times and normalized start/end times of the timeframes.
+
+    Args:
+        export_format (str): export the output as "json", "jsonl" or "arrow" instead of printing a table. Optional.
+        output_path (str): path to write the exported output to. Optional.
+        id_pattern (str): only list the timeframes with IDs matching this glob pattern. Optional.
+    """
+
+    # Select the timeframes, reusing the selection if the session is unchanged.
+    if id_pattern is None:
+        timeframes = TIMEFRAMES
+    else:
+        timeframes = get_cached_result(("selection", id_pattern), lambda: select_timeframes(id_pattern))
+
+    # Export the timeframes in a machine-readable format.
+    if export_format is not None:
+        from export import export_timeframes
+
+        print_export(
+            "ls",
+            lambda: export_timeframes(timeframes, export_format, output_path, columns=session_columns(timeframes)),
+            output_path
+        )
+        return
+
+    # Creating the timeframes table as a multiline string, reusing the table if the session is unchanged.
+    timeframes_table = get_cached_result(("timeframe_table", id_pattern), lambda: generate_timeframe_table(timeframes))
 
     # Print the timeframes table.
     print(timeframes_table)
@@ -260,6 +1289,462 @@ def print_help(print_divider: bool = False) -> None:
         print(f"{('_' * 80)}\n")
 
 
+def capture_output(command: list) -> str:
+    """ Run a command and capture its printed output.
+
+    Args:
+        command (list): the command, split into the action and its arguments. It is not modified.
+
+    Returns:
+        the printed output.
+    """
+
+    with redirect_stdout(io.StringIO()) as output:
+        run_command(list(command))
+
+    return output.getvalue()
+
+
+def last_output_line(output: str) -> str:
+    """ Get the last line of a command's output worth showing on a status line.
+
+    Args:
+        output (str): the printed output of the command.
+
+    Returns:
+        the last non-empty line that is not a prompt, or "" if there is none.
+    """
+
+    for line in reversed(output.splitlines()):
+        if line.strip() not in {"", ">>"}:
+            return line.strip()
+
+    return ""
+
+
+def live_dashboard(pane_names: list, fps: float = 20) -> None:
+    """ Keep the output of ls, vis and find on screen while commands are entered, until 'exit'.
+
+    Only the rows that changed since the last frame are rewritten, and frames are drawn at most fps times a second. A
+    burst of commands, e.g. hundreds of pasted 'add' commands, is applied without drawing a frame per command.
+
+    Args:
+        pane_names (list): the panes to show: "ls", "vis" and/or "find".
+        fps (float): maximum number of frames drawn per second.
+    """
+
+    from dashboard import LineReader, PromptingReader, Screen, fit_panes
+
+    # Reading stdin with a timeout requires select() on a file descriptor.
+    if os.name == "nt":
+        print("live: not supported on Windows.\n")
+        return
+
+    screen = Screen(fps)
+    reader = LineReader(sys.stdin.fileno())
+
+    # Commands shown in the panes, stored as {pane_name: command}. Typing ls, vis or find changes the command of a pane.
+    panes = {pane_name: [pane_name] for pane_name in pane_names}
+
+    # Text of the status line, the last output of the previous command.
+    status = "Live mode. ls, vis and find change the panes, other commands run as usual. Type exit to leave."
+
+    def draw_frame() -> None:
+        # Render the panes, reusing the cached tables if the session is unchanged, and draw the changed rows.
+        columns, rows = screen.size()
+        texts = [(" ".join(command), capture_output(command)) for command in panes.values()]
+        screen.draw(fit_panes(texts, columns, rows - 2), status)
+
+    def read_line(timeout: float = None) -> str | None:
+        # Read the next line of input. An entered line leaves the prompt row blank.
+        line = reader.readline(timeout)
+        if line:
+            screen.line_entered()
+        return line
+
+    def show_question() -> None:
+        # Show a command's input() question, e.g. an overwrite confirmation, before reading the answer.
+        nonlocal status
+        status = last_output_line(output.getvalue())
+        draw_frame()
+
+    # A frame is due once the session or status changed.
+    dirty = True
+
+    screen.enter()
+
+    try:
+        while True:
+            if dirty and screen.due_in() == 0:
+                draw_frame()
+                dirty = False
+
+            # Wait for the next command, or until the pending frame may be drawn.
+            line = read_line(screen.due_in() if dirty else None)
+
+            if line is None:
+                continue
+
+            # End of input.
+            if line == "":
+                break
+
+            command = line.split()
+            if not command:
+                continue
+
+            action = command[0]
+            dirty = True
+
+            if action in {"X", "exit", "quit"}:
+                break
+
+            # Change the command of a pane. Exports run once as other commands, instead of rewriting the output on every
+            # frame.
+            if action in LIVE_PANES and not {"--format", "--out"} & set(command):
+                panes[LIVE_PANES[action]] = command
+                status = f"Showing \"{' '.join(command)}\"."
+
+            # Redraw every row.
+            elif action == "clear":
+                screen.enter()
+                status = ""
+
+            elif action in {"live", "watch"}:
+                status = f"{action}: not available in live mode."
+
+            # Run the command, showing its last line of output on the status line.
+            else:
+                output = io.StringIO()
+                stdin = sys.stdin
+                sys.stdin = PromptingReader(read_line, show_question)
+
+                try:
+                    with redirect_stdout(output):
+                        remove_expired_timeframes(action)
+                        run_command(command)
+                finally:
+                    sys.stdin = stdin
+
+                status = last_output_line(output.getvalue())
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        screen.leave()
+
+    print("Left live mode.\n")
+
+
+def run_command(command: list) -> bool:
+    """ Run a command.
+
+    Args:
+        command (list): the command, split into the action and its arguments.
+
+    Returns:
+        False if the command is exit, else True.
+    """
+
+    global EXPIRY_ENABLED, EXPIRY_CUTOFF
+
+    # The first string is the action to perform.
+    action = command[0]
+
+    # ADD
+    if action == "add":
+        # Parse and validate the arguments.
+        try:
+            timeframe_id, utc_offset, start_time, end_time = parse_add_arguments(command)
+        except ValueError as ve:
+            print(ve)
+            return True
+
+        # Add the timeframe if it passes all the validation checks.
+        add_timeframe(timeframe_id=timeframe_id,
+                      utc_offset=utc_offset,
+                      start_time=start_time,
+                      end_time=end_time)
+    # ---------- #
+
+    # FIND / RUN / SYNC
+    elif action in {"find", "run", "sync"}:
+        # Parse the export options.
+        try:
+            export_format, output_path = parse_export_options(command)
+        except ValueError as ve:
+            print(f"find: {ve}\n")
+            return True
+
+        # Parse the ID pattern.
+        try:
+            id_pattern = pop_option(command, "--ids")
+        except ValueError as ve:
+            print(f"find: {ve}\n")
+            return True
+
+        # The export contains the localized times of every timeframe, so it cannot be grouped by UTC offset.
+        if export_format is not None and "--by-offset" in command[1:]:
+            print("find: option --by-offset cannot be combined with --format.\n")
+            return True
+
+        # Find the common timeframe.
+        find_common_timeframe(by_offset="--by-offset" in command[1:],
+                              export_format=export_format,
+                              output_path=output_path,
+                              id_pattern=id_pattern)
+    # ---------- #
+
+    # BOTTLENECK
+    elif action == "bottleneck":
+        # Check number of arguments.
+        if len(command) > 2:
+            print(f"\nbottleneck: Expected 0 or 1 argument \"duration\" but found {len(command) - 1} arguments.")
+            return True
+
+        # Parse the optional target duration.
+        try:
+            target_minutes = parse_duration_argument(command[1]) if len(command) == 2 else None
+        except ValueError as ve:
+            print(f"bottleneck: {ve}\n")
+            return True
+
+        find_bottlenecks(target_minutes=target_minutes)
+    # ---------- #
+
+    # LIVE
+    elif action == "live":
+        # Parse the frame rate.
+        try:
+            fps = pop_option(command, "--fps") or "20"
+            fps = float(fps)
+        except ValueError:
+            print("live: option --fps expects a number.\n")
+            return True
+
+        # Check the panes.
+        pane_names = [LIVE_PANES.get(argument) for argument in command[1:]] or ["ls", "find"]
+        if None in pane_names or fps <= 0:
+            print("live: Expected panes ls, vis and/or find, and a positive --fps.\n")
+            return True
+
+        live_dashboard(pane_names=list(dict.fromkeys(pane_names)), fps=fps)
+    # ---------- #
+
+    # WATCH
+    elif action == "watch":
+        # Check number of arguments.
+        if len(command) != 2:
+            print(f"\nwatch: Expected 1 argument \"path\" but found {len(command) - 1} arguments.")
+            return True
+
+        # Follow the feed until interrupted.
+        watch_feed(path=command[1])
+    # ---------- #
+
+    # EXPIRE
+    elif action == "expire":
+        # Enable or disable the expiry policy.
+        if len(command) > 1 and command[1] in {"on", "off"}:
+            enable = command[1] == "on"
+            arguments = command[2:]
+        else:
+            enable = None
+            arguments = command[1:]
+
+        # Parse the optional cutoff.
+        if len(arguments) not in {0, 2}:
+            print(f"\nexpire: Expected 0 or 2 arguments \"date time\" but found {len(arguments)} arguments.")
+            return True
+
+        try:
+            cutoff = parse_datetime_arguments(*arguments) if arguments else None
+        except ValueError as ve:
+            print(f"expire: {ve}\n")
+            return True
+
+        # Update the expiry policy.
+        if enable is not None:
+            EXPIRY_ENABLED = enable
+            EXPIRY_CUTOFF = cutoff
+
+            if not enable:
+                print("Expiry disabled.\n")
+                return True
+
+            print(f"Expiry enabled. Cutoff: "
+                  f"{cutoff.strftime(DATETIME_FORMAT) + ' UTC' if cutoff is not None else 'current UTC time'}.")
+
+        # Sweep the expired timeframes.
+        expired_count = expire_timeframes(cutoff)
+        print(f"{expired_count} expired timeframe(s) removed.\n")
+    # ---------- #
+
+    # MERGE
+    elif action == "merge":
+        # Parse the conflict policy.
+        try:
+            policy = pop_option(command, "--policy") or "fail"
+        except ValueError as ve:
+            print(f"merge: {ve}\n")
+            return True
+
+        # Check number of arguments.
+        if len(command) != 2:
+            print(f"\nmerge: Expected 1 argument \"path\" but found {len(command) - 1} arguments.")
+            return True
+
+        merge_file(path=command[1], policy=policy)
+    # ---------- #
+
+    # SWEEP
+    elif action == "sweep":
+        # Parse the quorum and memory budget.
+        try:
+            quorum = pop_option(command, "--quorum")
+            memory_mb = pop_option(command, "--memory-mb") or "256"
+        except ValueError as ve:
+            print(f"sweep: {ve}\n")
+            return True
+
+        if not memory_mb.isdigit() or (quorum is not None and not quorum.isdigit()):
+            print("sweep: options --quorum and --memory-mb expect whole numbers.\n")
+            return True
+
+        # Check number of arguments.
+        if len(command) != 2:
+            print(f"\nsweep: Expected 1 argument \"path\" but found {len(command) - 1} arguments.")
+            return True
+
+        sweep_timeframes(path=command[1],
+                         quorum=int(quorum) if quorum is not None else None,
+                         memory_mb=int(memory_mb))
+    # ---------- #
+
+    # SHARE
+    elif action == "share":
+        # Check number of arguments.
+        if len(command) != 2:
+            print(f"\nshare: Expected 1 argument \"name\" but found {len(command) - 1} arguments.")
+            return True
+
+        share_session(name=None if command[1] == "off" else command[1])
+    # ---------- #
+
+    # REMOVE
+    elif action == "remove":
+        # Check number of arguments.
+        if len(command) < 2:
+            print(f"\nremove: Expected 1 argument \"timeframe-id\" but found 0 arguments.")
+            return True
+
+        # Remove all timeframes matching a pattern, unless the argument is an existing timeframe ID.
+        if has_wildcards(command[1]) and command[1] not in TIMEFRAMES:
+            remove_timeframes(id_pattern=command[1])
+        else:
+            remove_timeframe(timeframe_id=command[1])
+    # ---------- #
+
+    # RESET
+    elif action == "reset":
+        reset()
+    # ---------- #
+
+    # UNDO / REDO
+    elif action == "undo":
+        undo()
+
+    elif action == "redo":
+        redo()
+    # ---------- #
+
+    # CHECKPOINT / RESTORE
+    elif action in {"checkpoint", "restore"}:
+        # Check number of arguments.
+        if len(command) != 2:
+            print(f"\n{action}: Expected 1 argument \"name\" but found {len(command) - 1} arguments.")
+            return True
+
+        if action == "checkpoint":
+            create_checkpoint(name=command[1])
+        else:
+            restore_checkpoint(name=command[1])
+    # ---------- #
+
+    # LIST
+    elif action in {"ls", "list"}:
+        # Parse the export options.
+        try:
+            export_format, output_path = parse_export_options(command)
+        except ValueError as ve:
+            print(f"ls: {ve}\n")
+            return True
+
+        list_timeframes(export_format=export_format,
+                        output_path=output_path,
+                        id_pattern=command[1] if len(command) > 1 else None)
+    # ---------- #
+
+    # VISUALIZE
+    elif action == "vis":
+        # Parse the export options.
+        try:
+            export_format, output_path = parse_export_options(command)
+        except ValueError as ve:
+            print(f"vis: {ve}\n")
+            return True
+
+        # Parse the density options.
+        try:
+            group_by = pop_option(command, "--by")
+        except ValueError as ve:
+            print(f"vis: {ve}\n")
+            return True
+
+        if group_by not in {None, "offset", "prefix"}:
+            print(f"vis: unsupported grouping \"{group_by}\". Expected one of: offset, prefix.\n")
+            return True
+
+        # The density visualization has no export format, and only the density visualization is grouped.
+        if "--density" in command[1:] and export_format is not None:
+            print("vis: option --density cannot be combined with --format.\n")
+            return True
+
+        if group_by is not None and "--density" not in command[1:]:
+            print("vis: option --by requires --density.\n")
+            return True
+
+        # Visualize the density of the timeframes, or each timeframe.
+        if "--density" in command[1:]:
+            visualize_density(group_by=group_by)
+        else:
+            visualize_timeframes(export_format=export_format, output_path=output_path)
+    # ---------- #
+
+    # CLEAR
+    elif action == "clear":
+        clear_screen()
+    # ---------- #
+
+    # HELP
+    elif action == "help":
+        # Print help.
+        print_help()
+    # ---------- #
+
+    # EXIT
+    elif action in {"X", "exit", "quit"}:
+        return False
+    # ---------- #
+
+    # INVALID COMMAND
+    else:
+        print("Invalid command.")
+
+    return True
+
+
 def main():
     # Clear the terminal.
     clear_screen()
@@ -280,146 +1765,20 @@ def main():
 
         # Split the command string into a list. Whitespace is the delimiter character.
         command = command.split()
-        # The first string is the action to perform.
-        action = command[0]
 
         # Spacing.
         print()
 
-        """ Analyzing Command """
-        # ADD
-        if action == "add":
-            # Number of arguments: Min number of arguments: 6. Max number of arguments: 7.
-            if len(command) not in {6, 7}:
-                print(f"\nadd: Expected 6 or 7 arguments but found {len(command) - 1}."
-                      f"\n     Required arguments: timeframe-id, utc-offset, start-date, start-time, end-date, end-time"
-                      )
-                continue
+        # Remove expired timeframes if the expiry policy is enabled.
+        remove_expired_timeframes(command[0])
 
-            # Breakdown the command.
-            timeframe_id = command[1]
-
-            # Format the date string.
-            command[3] = format_date(command[3])
-
-            # Format UTC offset string.
-            try:
-                utc_offset = format_utc_offset(command[2])
-            except ValueError as ve:
-                print(f"utc-offset: {ve}\n")
-                continue
-
-            # Format start time string.
-            try:
-                start_time = f"{command[3]} {format_time(command[4])}"
-            except ValueError as ve:
-                print(f"start-time: {ve}\n")
-                continue
-
-            # Format end time string.
-            try:
-                # If 6 arguments are provided, use the start date as the end date.
-                end_time = f"{command[3] if len(command) == 6 else format_date(command[5])} {format_time(command[-1])}"
-            except ValueError as ve:
-                print(f"end-time: {ve}\n")
-                continue
-
-            # Validate utc-offset format.
-            flag, error_message = is_valid_offset(utc_offset)
-            if flag is False:
-                print(f"\nadd: {error_message}\n")
-                continue
-
-            # Validate start-time format.
-            if not is_valid_datetime(start_time):
-                print("\nadd: Incorrect format of start-time argument. Expected format: DD-MM-YY HH:MM.\n")
-                continue
-
-            # Validate end-time format.
-            if not is_valid_datetime(end_time):
-                print("\nadd: Incorrect format of end-time argument. Expected format: DD-MM-YY HH:MM.\n")
-                continue
-
-            # Try to parse start_time string to datetime object.
-            try:
-                # Create datetime object for start time.
-                start_time = datetime.strptime(start_time, DATETIME_FORMAT)
-            except ValueError:
-                print("Illegal start-time argument.")
-                continue
-
-            # Try to parse end_time string to datetime object.
-            try:
-                # Create datetime object for end time.
-                end_time = datetime.strptime(end_time, DATETIME_FORMAT)
-            except ValueError:
-                print("Illegal end-time argument.")
-                continue
-
-            # Add the timeframe if it passes all the validation checks.
-            add_timeframe(timeframe_id=timeframe_id,
-                          utc_offset=utc_offset,
-                          start_time=start_time,
-                          end_time=end_time)
-        # ---------- #
-
-        # FIND / RUN / SYNC
-        elif action in {"find", "run", "sync"}:
-            # Ensure there are more than 1 timeframes provided.
-            if len(TIMEFRAMES) <= 1:
-                print(f"\nfind: {len(TIMEFRAMES)} timeframe(s) provided."
-                      "\n      Provide at least 2 timeframes to find a common timeframe.")
-                continue
-
-            # Find the common timeframe.
-            find_common_timeframe()
-        # ---------- #
-
-        # REMOVE
-        elif action == "remove":
-            # Check number of arguments.
-            if len(command) < 2:
-                print(f"\nremove: Expected 1 argument \"timeframe-id\" but found 0 arguments.")
-                continue
-
-            # Remove the timeframe.
-            remove_timeframe(timeframe_id=command[1])
-        # ---------- #
-
-        # RESET
-        elif action == "reset":
-            reset()
-        # ---------- #
-
-        # LIST
-        elif action in {"ls", "list"}:
-            list_timeframes()
-        # ---------- #
-
-        # VISUALIZE
-        elif action == "vis":
-            visualize_timeframes()
-        # ---------- #
-
-        # CLEAR
-        elif action == "clear":
-            clear_screen()
-        # ---------- #
-
-        # HELP
-        elif action == "help":
-            # Print help.
-            print_help()
-        # ---------- #
-
-        # EXIT
-        elif action in {"X", "exit", "quit"}:
+        # Run the command. Stop on exit.
+        if not run_command(command):
             break
-        # ---------- #
 
-        # INVALID COMMAND
-        else:
-            print("Invalid command.")
+    # Stop sharing the session.
+    if SHARED_SESSION is not None:
+        share_session(name=None)
 
     # Exit the program.
     sys.exit(0)
@@ -1,18 +1,40 @@
-import os
-import re
-from typing import Tuple
+import sys
+from bisect import bisect_left
+from typing import Iterable, Tuple
 from datetime import datetime, timedelta
 
+from timeframe import DATETIME_FORMAT, EPOCH
+
+# Characters used to shade the density visualization, from no timeframes to all timeframes of a group.
+DENSITY_SHADES = " ░▒▓█"
 
 VALID_UTC_OFFSETS = ["-12:00", "-11:00", "-10:00", "-09:30", "-09:00", "-08:00", "-07:00", "-06:00", "-05:00", "-04:00",
                      "-03:30", "-03:00", "-02:00", "-01:00", "-00:00", "+00:00", "+01:00", "+02:00", "+03:00", "+03:30",
                      "+04:00", "+04:30", "+05:00", "+05:30", "+05:45", "+06:00", "+06:30", "+07:00", "+08:00", "+08:45",
                      "+09:00", "+09:30", "+10:00", "+10:30", "+11:00", "+12:00", "+12:45", "+13:00", "+14:00"]
 
+# Set of the valid UTC offsets, and the position of each offset in VALID_UTC_OFFSETS, used to sort by UTC offset.
+VALID_UTC_OFFSET_SET = frozenset(VALID_UTC_OFFSETS)
+UTC_OFFSET_ORDER = {utc_offset: index for index, utc_offset in enumerate(VALID_UTC_OFFSETS)}
+
+# Characters allowed at each position of a ±HH:MM UTC offset string and a DD-MM-YY HH:MM datetime string.
+DIGITS = frozenset("0123456789")
+UTC_OFFSET_CHARACTERS = (frozenset("+,-"), DIGITS, DIGITS, frozenset(":"), DIGITS, DIGITS)
+DATETIME_CHARACTERS = (frozenset("0123"), DIGITS, frozenset("-"), frozenset("01"), DIGITS, frozenset("-"), DIGITS,
+                       DIGITS, frozenset(" "), frozenset("012"), DIGITS, frozenset(":"), frozenset("012345"), DIGITS)
+
+# ANSI escape sequence to clear the terminal and move the cursor to the top left corner.
+CLEAR_SCREEN_SEQUENCE = "\033[2J\033[H"
+
 
 def clear_screen() -> None:
     """ Utility function to clear the Terminal. """
-    os.system('cls' if os.name == 'nt' else 'clear')
+
+    # Write the ANSI escape sequence directly instead of running a clear command in a shell. Output that is not a
+    # terminal is left as is.
+    if sys.stdout.isatty():
+        sys.stdout.write(CLEAR_SCREEN_SEQUENCE)
+        sys.stdout.flush()
 
 
 def format_time(time_str: str) -> str:
@@ -235,11 +257,9 @@ def is_valid_datetime(in_datetime: str) -> bool:
         True if the input matches the DD-MM-YY HH:MM format.
     """
 
-    # Regex for datetime format.
-    datetime_re = re.compile(r"^[0-3]\d-[0-1]\d-\d{2} [0-2]\d:[0-5]\d$")
-
-    # Match in_datetime argument with datetime regex.
-    return bool(datetime_re.match(in_datetime))
+    # Check every character of in_datetime against the characters allowed at its position.
+    return len(in_datetime) == len(DATETIME_CHARACTERS) and \
+        all(character in allowed for character, allowed in zip(in_datetime, DATETIME_CHARACTERS))
 
 
 def is_valid_offset(input_offset: str) -> Tuple[bool, str]:
@@ -257,15 +277,13 @@ def is_valid_offset(input_offset: str) -> Tuple[bool, str]:
     # Error message to print to the terminal.
     error_message = ""
 
-    # Regex expression for UTC offset.
-    offset_re = re.compile(r"^[+,-]\d{2}:\d{2}$")
-
-    # Match input_offset argument with offset regex.
-    if not offset_re.match(input_offset):
+    # Check every character of input_offset against the characters allowed at its position.
+    if len(input_offset) != len(UTC_OFFSET_CHARACTERS) or \
+            not all(character in allowed for character, allowed in zip(input_offset, UTC_OFFSET_CHARACTERS)):
         flag = False
         error_message = "Incorrect format of UTC offset. Expected format: ±HH:MM."
 
-    elif input_offset not in VALID_UTC_OFFSETS:
+    elif input_offset not in VALID_UTC_OFFSET_SET:
         flag = False
         error_message = "Invalid UTC offset. Provide a valid UTC offset."
 
@@ -273,6 +291,244 @@ def is_valid_offset(input_offset: str) -> Tuple[bool, str]:
     return flag, error_message
 
 
+def parse_add_arguments(command: list) -> Tuple[str, str, datetime, datetime]:
+    """ Parse and validate the arguments of an 'add' command.
+
+    Args:
+        command (list): the split command, including the "add" action.
+
+    Returns:
+        a tuple (timeframe_id, utc_offset, start_time, end_time).
+
+    Raises:
+        ValueError: if the arguments are invalid. The exception message is the error message to print.
+    """
+
+    # Number of arguments: Min number of arguments: 6. Max number of arguments: 7.
+    if len(command) not in {6, 7}:
+        raise ValueError(f"\nadd: Expected 6 or 7 arguments but found {len(command) - 1}."
+                         f"\n     Required arguments: timeframe-id, utc-offset, start-date, start-time, end-date, end-time")
+
+    # Breakdown the command.
+    timeframe_id = command[1]
+
+    # Format the date string.
+    start_date = format_date(command[3])
+
+    # Format UTC offset string.
+    try:
+        utc_offset = format_utc_offset(command[2])
+    except ValueError as ve:
+        raise ValueError(f"utc-offset: {ve}\n") from None
+
+    # Format start time string.
+    try:
+        start_time = f"{start_date} {format_time(command[4])}"
+    except ValueError as ve:
+        raise ValueError(f"start-time: {ve}\n") from None
+
+    # Format end time string.
+    try:
+        # If 6 arguments are provided, use the start date as the end date.
+        end_time = f"{start_date if len(command) == 6 else format_date(command[5])} {format_time(command[-1])}"
+    except ValueError as ve:
+        raise ValueError(f"end-time: {ve}\n") from None
+
+    # Validate utc-offset format.
+    flag, error_message = is_valid_offset(utc_offset)
+    if flag is False:
+        raise ValueError(f"\nadd: {error_message}\n")
+
+    # Validate start-time format.
+    if not is_valid_datetime(start_time):
+        raise ValueError("\nadd: Incorrect format of start-time argument. Expected format: DD-MM-YY HH:MM.\n")
+
+    # Validate end-time format.
+    if not is_valid_datetime(end_time):
+        raise ValueError("\nadd: Incorrect format of end-time argument. Expected format: DD-MM-YY HH:MM.\n")
+
+    # Try to parse start_time string to datetime object.
+    try:
+        # Create datetime object for start time.
+        start_time = datetime.strptime(start_time, DATETIME_FORMAT)
+    except ValueError:
+        raise ValueError("Illegal start-time argument.") from None
+
+    # Try to parse end_time string to datetime object.
+    try:
+        # Create datetime object for end time.
+        end_time = datetime.strptime(end_time, DATETIME_FORMAT)
+    except ValueError:
+        raise ValueError("Illegal end-time argument.") from None
+
+    return timeframe_id, utc_offset, start_time, end_time
+
+
+def parse_datetime_arguments(date_str: str, time_str: str) -> datetime:
+    """ Parse a date argument and a time argument into a datetime object.
+
+    Args:
+        date_str (str): the date argument. Accepts the same shorthands as the 'add' command.
+        time_str (str): the time argument. Accepts the same relaxed formats as the 'add' command.
+
+    Returns:
+        the datetime object.
+    """
+
+    datetime_str = f"{format_date(date_str)} {format_time(time_str)}"
+
+    # Validate the datetime format.
+    if not is_valid_datetime(datetime_str):
+        raise ValueError("Incorrect format of datetime. Expected format: DD-MM-YY HH:MM.")
+
+    return datetime.strptime(datetime_str, DATETIME_FORMAT)
+
+
+def parse_duration_argument(duration_str: str) -> int:
+    """ Parse a duration argument into minutes.
+
+    Args:
+        duration_str (str): the duration argument. Accepts the same relaxed formats as time arguments, e.g. "2" for
+                            2 hours or "130" for 1 hour 30 minutes.
+
+    Returns:
+        the duration in minutes.
+    """
+
+    hours, minutes = format_time(duration_str).split(":")
+
+    # Minutes must not overflow into the next hour.
+    if int(minutes) >= 60:
+        raise ValueError("Incorrect format of duration. Expected format: HH:MM.")
+
+    return int(hours) * 60 + int(minutes)
+
+
+def has_wildcards(pattern: str) -> bool:
+    """ Check if an ID pattern contains glob wildcards ("*", "?" or "[").
+
+    Args:
+        pattern (str): the ID pattern.
+
+    Returns:
+        True if the pattern contains wildcards.
+    """
+
+    return any(character in pattern for character in "*?[")
+
+
+def select_ids(sorted_ids: list, pattern: str) -> list:
+    """ Select the IDs matching a glob pattern, e.g. "eng-*" or "eng-berlin-0??".
+
+    The literal prefix of the pattern (everything before the first wildcard) is located with a binary search, so
+    only the IDs sharing the prefix are matched against the pattern: O(log n + k).
+
+    Args:
+        sorted_ids (list): sorted list of IDs.
+        pattern (str): the glob pattern.
+
+    Returns:
+        a sorted list of the matching IDs.
+    """
+
+    # Literal prefix of the pattern.
+    prefix_len = min((pattern.index(character) for character in "*?[" if character in pattern), default=len(pattern))
+    prefix = pattern[:prefix_len]
+
+    # Range of IDs that start with the prefix.
+    low = bisect_left(sorted_ids, prefix)
+    if prefix:
+        high = bisect_left(sorted_ids, prefix[:-1] + chr(ord(prefix[-1]) + 1), low)
+    else:
+        high = len(sorted_ids)
+
+    # "prefix*" matches the whole range.
+    if pattern == prefix + "*":
+        return sorted_ids[low:high]
+
+    # fnmatch compiles patterns with the re module, so it is only imported once a pattern has to be matched.
+    from fnmatch import fnmatchcase
+
+    return [timeframe_id for timeframe_id in sorted_ids[low:high] if fnmatchcase(timeframe_id, pattern)]
+
+
+def group_by_offset(timeframes: dict) -> dict:
+    """ Group timeframe IDs by UTC offset.
+
+    Args:
+        timeframes (dict): timeframes to group.
+
+    Returns:
+        a dict of timeframe IDs grouped by UTC offset, stored as {utc_offset: {timeframe_id, ...}}.
+    """
+
+    offset_index = {}
+
+    for timeframe_id, timeframe in timeframes.items():
+        offset_index.setdefault(timeframe.get_utc_offset(), set()).add(timeframe_id)
+
+    return offset_index
+
+
+def pop_option(arguments: list, option: str) -> str | None:
+    """ Remove an option and its value from a list of command arguments.
+
+    Args:
+        arguments (list): the command arguments. The option and its value are removed in place.
+        option (str): name of the option, e.g. "--format".
+
+    Returns:
+        the value of the option, or None if the option is not present.
+    """
+
+    # Option is not present.
+    if option not in arguments:
+        return None
+
+    index = arguments.index(option)
+
+    # The option must be followed by a value.
+    if index + 1 >= len(arguments):
+        raise ValueError(f"option {option} expects a value.")
+
+    value = arguments[index + 1]
+    del arguments[index:index + 2]
+
+    return value
+
+
+def select_weight(difference: int, max_length: int) -> int:
+    """ Select the number of minutes represented by one character of a visualization.
+
+    Args:
+        difference (int): duration to visualize in minutes.
+        max_length (int): maximum number of characters available for the visualization.
+
+    Returns:
+        the weight in minutes.
+    """
+
+    # Initialize weight to None.
+    weight = None
+    # Smaller weights.
+    weights = [1, 5, 10, 15, 20, 25, 30, 45]
+
+    # Check if any of the smaller weights are suitable.
+    for wt in weights:
+        if difference / wt < max_length:
+            weight = wt
+            break
+
+    # If none of the smaller weights were suitable, look for suitable weight in multiples of 30. (1, 1.5, 2, 2.5 hours)
+    if weight is None:
+        for multiplier in range(2, 50):
+            weight = 30 * multiplier
+            if difference / weight < max_length:
+                break
+
+    return weight
+
+
 def get_duration_string(minutes: int) -> str:
     """ Builds a string of format "DD days HH hours MM minutes" from inputted minutes.
 
@@ -333,12 +589,41 @@ def generate_timeframe_table(timeframes: dict) -> str:
     return str(table)
 
 
-def generate_localized_times_table(timeframes: dict, common_timeframe: Tuple[datetime, datetime] = None) -> str:
+def localize_by_offset(offset_index: dict, timeframes: dict, common_timeframe: Tuple[datetime, datetime]) -> dict:
+    """ Localize the common timeframe once for every distinct UTC offset.
+
+    Args:
+        offset_index (dict): timeframe IDs grouped by UTC offset, stored as {utc_offset: {timeframe_id, ...}}.
+        timeframes (dict): timeframes referenced by the offset index.
+        common_timeframe (tuple): the common timeframe of the timeframes.
+
+    Returns:
+        a dict containing the localized start and end times as strings, stored as {utc_offset: [start, end]}.
+    """
+
+    # Dict to store the localized times of each UTC offset.
+    localized_times = {}
+
+    for utc_offset, timeframe_ids in offset_index.items():
+        # Skip empty offset buckets.
+        if not timeframe_ids:
+            continue
+
+        # Every timeframe in a bucket shares the same UTC offset, so any one of them can localize the times.
+        timeframe = timeframes[next(iter(timeframe_ids))]
+        localized_times[utc_offset] = timeframe.to_local_time(common_timeframe)
+
+    return localized_times
+
+
+def generate_localized_times_table(timeframes: dict, common_timeframe: Tuple[datetime, datetime] = None,
+                                   localized_times: dict = None) -> str:
     """ Generate a table containing the localized times of the common timeframe for each timeframe.
 
     Args:
         timeframes (dict): timeframes to include in the table.
         common_timeframe (tuple): the common timeframe of the timeframes.
+        localized_times (dict): precomputed localized times, stored as {utc_offset: [start, end]}. Optional.
 
     Returns:
         a table of the localized times as a multiline string
@@ -355,45 +640,231 @@ def generate_localized_times_table(timeframes: dict, common_timeframe: Tuple[dat
         # Getting the UTC offset of the timeframe.
         utc_offset = timeframe.get_utc_offset()
 
-        # Getting the localized start and end times.
-        localized_times = timeframe.to_local_time(common_timeframe)
+        # Getting the localized start and end times, shared by all timeframes with the same UTC offset if available.
+        if localized_times is not None and utc_offset in localized_times:
+            localized = localized_times[utc_offset]
+        else:
+            localized = timeframe.to_local_time(common_timeframe)
 
         # Adding the timeframe row to the table.
-        table.add_row([timeframe_id, utc_offset, *localized_times])
+        table.add_row([timeframe_id, utc_offset, *localized])
+
+    return str(table)
+
+
+def generate_offset_summary_table(offset_index: dict, localized_times: dict) -> str:
+    """ Generate a table containing the localized times of the common timeframe for each UTC offset.
+
+    Used in the 'find --by-offset' action in TimeSync.
+
+    Args:
+        offset_index (dict): timeframe IDs grouped by UTC offset, stored as {utc_offset: {timeframe_id, ...}}.
+        localized_times (dict): localized times of each UTC offset, stored as {utc_offset: [start, end]}.
+
+    Returns:
+        a table of the localized times grouped by UTC offset as a multiline string.
+    """
+
+    # Column headers for the table.
+    column_headers = ["UTC Offset", "Timeframes", "Start Time", "End Time"]
+
+    # Create a new Table object.
+    table = Table(column_headers)
+
+    # Adding the rows in order of UTC offset.
+    for utc_offset in sorted(localized_times, key=UTC_OFFSET_ORDER.__getitem__):
+        table.add_row([utc_offset, str(len(offset_index[utc_offset])), *localized_times[utc_offset]])
 
     return str(table)
 
 
 def generate_visualization_table(timeframes: dict, weight: int, earliest_start_time: datetime) -> str:
+    """ Generate a table containing the visualization string of each timeframe.
+
+    Args:
+        timeframes (dict): timeframes to include in the table.
+        weight (int): number of minutes represented by one character.
+        earliest_start_time (datetime): earliest normalized start time among the timeframes.
+
+    Returns:
+        a table of the visualization strings as a multiline string.
+    """
+
     # Column headers for the table.
     column_headers = ["Timeframe ID", "Representation"]
 
     # Create a new Table object.
     table = Table(column_headers)
 
-    # Create timedelta object.
-    delta = timedelta(minutes=weight)
-
     # Adding the rows.
     for timeframe_id, timeframe in timeframes.items():
-        # Reference datetime is used to keep track of the
-        reference_datetime = earliest_start_time
+        # Get the visualization string of the timeframe.
+        vis_string = timeframe.to_vis_string(weight, earliest_start_time)
 
-        # Get the normalized start/end times for the timeframe.
-        start_time, end_time = timeframe.get_norm_times()
+        # Adding the timeframe id and vis string to the table.
+        table.add_row([timeframe_id, vis_string])
 
-        # Visualization string.
-        vis_string = ""
+    return str(table)
 
-        while reference_datetime < end_time:
-            # Add a "|" if the reference_datetime is within the timeframe. Else, print a whitespace.
-            vis_string += "|" if start_time <= reference_datetime else " "
 
-            # Update the reference_datetime.
-            reference_datetime += delta
+def compute_density(timeframes: Iterable, weight: int, earliest_start_time: datetime, num_slots: int) -> list:
+    """ Count the timeframes covering each character slot of a visualization.
 
-        # Adding the timeframe id and vis string to the table.
-        table.add_row([timeframe_id, vis_string])
+    Slot i represents the normalized time earliest_start_time + i * weight, and is covered by a timeframe if that time
+    is within the timeframe, as in the per-timeframe visualization. The counts are built with a difference array and a
+    prefix sum in O(n + num_slots).
+
+    Args:
+        timeframes (Iterable[TimeFrame]): timeframes to count.
+        weight (int): number of minutes represented by one slot.
+        earliest_start_time (datetime): normalized time represented by the first slot.
+        num_slots (int): number of slots.
+
+    Returns:
+        a list containing the number of timeframes covering each slot.
+    """
+
+    # Difference array. The count of a slot is the sum of all values up to and including its index.
+    difference = [0] * (num_slots + 1)
+
+    origin = (earliest_start_time - EPOCH) // timedelta(seconds=1)
+    slot_seconds = weight * 60
+
+    for timeframe in timeframes:
+        # First slot at or after the start time, and first slot at or after the end time (ceiling division).
+        first_slot = -(-(timeframe.norm_start_epoch - origin) // slot_seconds)
+        end_slot = min(-(-(timeframe.norm_end_epoch - origin) // slot_seconds), num_slots)
+
+        if first_slot < end_slot:
+            difference[first_slot] += 1
+            difference[end_slot] -= 1
+
+    # Prefix sum of the difference array.
+    counts = []
+    running_count = 0
+    for value in difference[:num_slots]:
+        running_count += value
+        counts.append(running_count)
+
+    return counts
+
+
+def generate_density_table(groups: dict, weight: int, earliest_start_time: datetime, num_slots: int) -> str:
+    """ Generate a table containing one shaded density strip for each group of timeframes.
+
+    Each character is shaded by the fraction of the group's timeframes that cover its slot.
+
+    Used in the 'vis --density' action in TimeSync.
+
+    Args:
+        groups (dict): groups of timeframes, stored as {group_name: [TimeFrame_object, ...]}.
+        weight (int): number of minutes represented by one character.
+        earliest_start_time (datetime): normalized time represented by the first character.
+        num_slots (int): number of characters in each strip.
+
+    Returns:
+        a table of the density strips as a multiline string.
+    """
+
+    # Column headers for the table.
+    column_headers = ["Group", "Timeframes", "Peak", "Density"]
+
+    # Create a new Table object.
+    table = Table(column_headers)
+
+    # Number of shades besides the blank shade.
+    levels = len(DENSITY_SHADES) - 1
+
+    # Adding the rows.
+    for group_name, timeframes in groups.items():
+        counts = compute_density(timeframes, weight, earliest_start_time, num_slots)
+        size = len(timeframes)
+
+        # Shade each slot by the fraction of the group covering it, rounded up so any coverage is visible.
+        density_string = "".join(DENSITY_SHADES[-(-count * levels // size)] for count in counts)
+
+        table.add_row([group_name, str(size), str(max(counts, default=0)), density_string])
+
+    return str(table)
+
+
+def generate_bottleneck_table(bottlenecks: list, with_target: bool = False) -> str:
+    """ Generate a table containing the timeframes that limit the common timeframe, and by how much.
+
+    Used in the 'bottleneck' action in TimeSync.
+
+    Args:
+        bottlenecks (list): the limiting timeframes. See window.analyze_bottlenecks().
+        with_target (bool): add a column with the extension needed to reach the target duration if True.
+
+    Returns:
+        a table of the limiting timeframes as a multiline string.
+    """
+
+    def describe_shift(start_seconds: int, end_seconds: int) -> str:
+        # Describe moving a timeframe's start earlier and its end later, e.g. "start 30 minutes earlier".
+        shifts = []
+        if start_seconds > 0:
+            shifts.append(f"start {get_duration_string(start_seconds // 60).strip()} earlier")
+        if end_seconds > 0:
+            shifts.append(f"end {get_duration_string(end_seconds // 60).strip()} later")
+        return ", ".join(shifts) if shifts else "-"
+
+    # Column headers for the table.
+    column_headers = ["Timeframe ID", "Limits", "Gain if dropped or shifted", "Shift for the full gain"]
+    if with_target:
+        column_headers.append("Extension to reach target")
+
+    # Create a new Table object.
+    table = Table(column_headers)
+
+    # Adding the rows.
+    for row in bottlenecks:
+        gain = get_duration_string(row["gain"] // 60).strip() or "-"
+        shift = describe_shift(row["shift_start"], row["shift_end"]) if row["gain"] > 0 else "-"
+        row_values = [row["timeframe_id"], row["limits"], gain, shift]
+
+        if with_target:
+            row_values.append("not enough" if row["extension"] is None else describe_shift(*row["extension"]))
+
+        table.add_row(row_values)
+
+    return str(table)
+
+
+def generate_coverage_table(histogram: dict, max_rows: int = 20) -> str:
+    """ Generate a table of how long each number of timeframes overlaps.
+
+    Used in the 'sweep' action in TimeSync.
+
+    Args:
+        histogram (dict): seconds covered by each number of timeframes, stored as {coverage: seconds}.
+        max_rows (int): maximum number of rows. Coverages are grouped into equal ranges if there are more.
+
+    Returns:
+        the table of coverages as a multiline string.
+    """
+
+    # Column headers for the table.
+    column_headers = ["Timeframes", "Duration", "Share"]
+
+    # Create a new Table object.
+    table = Table(column_headers)
+
+    peak = max(histogram, default=0)
+    total = sum(histogram.values())
+
+    # Number of coverages in each row.
+    width = -(-(peak + 1) // max_rows)
+
+    # Adding the rows.
+    for low in range(0, peak + 1, width):
+        high = min(low + width - 1, peak)
+        seconds = sum(histogram.get(coverage, 0) for coverage in range(low, high + 1))
+
+        label = str(low) if low == high else f"{low}-{high}"
+        share = f"{seconds / total:.1%}" if total else "-"
+        table.add_row([label, get_duration_string(seconds // 60).strip() or "-", share])
 
     return str(table)
 
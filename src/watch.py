@@ -0,0 +1,68 @@
+import time
+from typing import Iterator
+
+
+def follow_lines(path: str, poll_interval: float = 0.05) -> Iterator[str]:
+    """ Read the lines of a file, then keep following the file as new lines are appended (like "tail -f").
+
+    Existing lines are yielded first. Incomplete lines are held back until their newline character is written.
+    The generator only returns when the caller stops iterating, e.g. on KeyboardInterrupt.
+
+    Args:
+        path (str): path of the file to follow.
+        poll_interval (float): seconds to wait before checking the file again once the end is reached.
+
+    Yields:
+        each complete line of the file, without the trailing newline character.
+    """
+
+    with open(path, "r") as file:
+        # Part of a line that has been read but is not yet complete.
+        pending = ""
+
+        while True:
+            line = file.readline()
+
+            # End of file reached. Wait for more data to be appended.
+            if line == "":
+                time.sleep(poll_interval)
+                continue
+
+            pending += line
+
+            # Hold back incomplete lines until the writer finishes them.
+            if not pending.endswith("\n"):
+                continue
+
+            yield pending.rstrip("\r\n")
+            pending = ""
+
+
+def parse_event(line: str) -> list | None:
+    """ Split an event line of an availability feed into a command.
+
+    Events use the same syntax as the TimeSync commands:
+        add <timeframe-id> <utc-offset> <start-date> <start-time> [<end-date>] <end-time>
+        remove <timeframe-id>
+
+    Args:
+        line (str): a line of the feed.
+
+    Returns:
+        the split command, or None if the line is empty or a comment starting with "#".
+    """
+
+    line = line.strip()
+
+    if line == "" or line.startswith("#"):
+        return None
+
+    command = line.split()
+
+    if command[0] not in {"add", "remove"}:
+        raise ValueError(f"unknown event \"{command[0]}\". Expected \"add\" or \"remove\".")
+
+    if command[0] == "remove" and len(command) != 2:
+        raise ValueError(f"remove: Expected 1 argument \"timeframe-id\" but found {len(command) - 1} arguments.")
+
+    return command
@@ -0,0 +1,272 @@
+import heapq
+from datetime import datetime
+from itertools import count
+from typing import Iterable, Tuple
+
+from timeframe import TimeFrame
+
+
+def intersect_timeframes(timeframes: Iterable[TimeFrame]) -> Tuple[datetime, datetime] | None:
+    """ Find the common timeframe of the given timeframes with a single scan.
+
+    Args:
+        timeframes (Iterable[TimeFrame]): timeframes to intersect.
+
+    Returns:
+        the normalized (start, end) times of the common timeframe, or None if it does not exist.
+    """
+
+    latest_start_time = earliest_end_time = None
+
+    for timeframe in timeframes:
+        # Assign the timeframe's normalized start time to latest_start_time if it is later.
+        if latest_start_time is None or timeframe.norm_start_time > latest_start_time:
+            latest_start_time = timeframe.norm_start_time
+
+        # Assign the timeframe's normalized end time to earliest_end_time if it is earlier.
+        if earliest_end_time is None or timeframe.norm_end_time < earliest_end_time:
+            earliest_end_time = timeframe.norm_end_time
+
+    # No timeframes, or the latest start time >= the earliest end time: a common timeframe does not exist.
+    if latest_start_time is None or latest_start_time >= earliest_end_time:
+        return None
+
+    return latest_start_time, earliest_end_time
+
+
+class WindowIndex:
+    """
+    Index of the normalized start and end times of the stored timeframes.
+
+    Keeps four heaps: latest start, earliest end (the common timeframe and expiry), earliest start and latest end
+    (the span of all timeframes). Removed or replaced timeframes are not deleted from the heaps; their entries are discarded
+    lazily once they reach the top of a heap, so every update costs amortized O(log n).
+    """
+
+    def __init__(self) -> None:
+        # Heaps of entries (key, sequence, timeframe_id, timeframe). The sequence number breaks ties between entries.
+        self.latest_starts = []
+        self.earliest_ends = []
+        self.earliest_starts = []
+        self.latest_ends = []
+
+        # Sequence number generator for heap entries.
+        self.sequence = count()
+
+        # Number of live timeframes in the index, and number of entries pushed to each heap.
+        self.size = 0
+        self.entries = 0
+
+    def push(self, timeframe_id: str, timeframe: TimeFrame) -> None:
+        """ Add a timeframe to the index.
+
+        Args:
+            timeframe_id (str): ID of the timeframe.
+            timeframe (TimeFrame): the timeframe to add.
+        """
+
+        start, end = timeframe.norm_start_epoch, timeframe.norm_end_epoch
+        sequence = next(self.sequence)
+
+        heapq.heappush(self.latest_starts, (-start, sequence, timeframe_id, timeframe))
+        heapq.heappush(self.earliest_ends, (end, sequence, timeframe_id, timeframe))
+        heapq.heappush(self.earliest_starts, (start, sequence, timeframe_id, timeframe))
+        heapq.heappush(self.latest_ends, (-end, sequence, timeframe_id, timeframe))
+
+        self.size += 1
+        self.entries += 1
+
+    def discard(self, timeframes: dict) -> None:
+        """ Record that a timeframe was removed. Its heap entries are dropped lazily.
+
+        Args:
+            timeframes (dict): the stored timeframes, after the removal.
+        """
+
+        self.size -= 1
+
+        # Rebuild the heaps once stale entries outnumber the live ones, to bound memory.
+        if self.entries > 2 * self.size + 64:
+            self.rebuild(timeframes)
+
+    def replace(self, timeframe_id: str, timeframe: TimeFrame, timeframes: dict) -> None:
+        """ Replace a timeframe in the index. The entries of the replaced timeframe are dropped lazily.
+
+        Args:
+            timeframe_id (str): ID of the timeframe.
+            timeframe (TimeFrame): the new timeframe, already stored under its ID.
+            timeframes (dict): the stored timeframes, after the replacement.
+        """
+
+        self.push(timeframe_id, timeframe)
+        self.size -= 1
+
+        # Rebuild the heaps once stale entries outnumber the live ones, to bound memory.
+        if self.entries > 2 * self.size + 64:
+            self.rebuild(timeframes)
+
+    def clear(self) -> None:
+        """ Remove all timeframes from the index. """
+
+        self.__init__()
+
+    def rebuild(self, timeframes: dict) -> None:
+        """ Rebuild the index from the stored timeframes, dropping all stale entries.
+
+        Args:
+            timeframes (dict): the stored timeframes.
+        """
+
+        self.clear()
+        for timeframe_id, timeframe in timeframes.items():
+            self.push(timeframe_id, timeframe)
+
+    @staticmethod
+    def top(heap: list, timeframes: dict) -> Tuple[str, TimeFrame] | None:
+        """ Get the timeframe at the top of a heap, discarding stale entries.
+
+        Args:
+            heap (list): one of the index heaps.
+            timeframes (dict): the stored timeframes.
+
+        Returns:
+            a tuple (timeframe_id, timeframe) of the top of the heap, or None if the heap is empty.
+        """
+
+        while heap:
+            _, _, timeframe_id, timeframe = heap[0]
+
+            # The entry is live only if the same timeframe object is still stored under its ID.
+            if timeframes.get(timeframe_id) is timeframe:
+                return timeframe_id, timeframe
+
+            heapq.heappop(heap)
+
+        return None
+
+    def earliest_ending(self, timeframes: dict) -> Tuple[str, TimeFrame] | None:
+        """ Get the timeframe with the earliest normalized end time.
+
+        Args:
+            timeframes (dict): the stored timeframes.
+
+        Returns:
+            a tuple (timeframe_id, timeframe), or None if there are no timeframes.
+        """
+
+        return self.top(self.earliest_ends, timeframes)
+
+    def common_window(self, timeframes: dict) -> Tuple[datetime, datetime] | None:
+        """ Get the latest normalized start time and the earliest normalized end time.
+
+        Args:
+            timeframes (dict): the stored timeframes.
+
+        Returns:
+            a tuple (latest_start_time, earliest_end_time), or None if there are no timeframes.
+        """
+
+        latest_start = self.top(self.latest_starts, timeframes)
+        earliest_end = self.top(self.earliest_ends, timeframes)
+
+        if latest_start is None:
+            return None
+
+        return latest_start[1].norm_start_time, earliest_end[1].norm_end_time
+
+    def span(self, timeframes: dict) -> Tuple[datetime, datetime] | None:
+        """ Get the earliest normalized start time and the latest normalized end time.
+
+        Args:
+            timeframes (dict): the stored timeframes.
+
+        Returns:
+            a tuple (earliest_start_time, latest_end_time), or None if there are no timeframes.
+        """
+
+        earliest_start = self.top(self.earliest_starts, timeframes)
+        latest_end = self.top(self.latest_ends, timeframes)
+
+        if earliest_start is None:
+            return None
+
+        return earliest_start[1].norm_start_time, latest_end[1].norm_end_time
+
+
+def analyze_bottlenecks(timeframes: dict, target_seconds: int = None) -> dict:
+    """ Find the timeframes that limit the common timeframe, and by how much.
+
+    Only the two latest normalized start times and the two earliest normalized end times are tracked, in one pass.
+    Dropping a timeframe, or shifting it out of the way, can only move the start of the common timeframe back to the
+    second latest start time if it holds the latest one, and its end forward to the second earliest end time if it
+    holds the earliest one. Every other timeframe does not limit the common timeframe.
+
+    Args:
+        timeframes (dict): the timeframes to analyze, at least 2.
+        target_seconds (int): target duration of the common timeframe in seconds. Optional.
+
+    Returns:
+        the analysis, stored as {"window": (start_epoch, end_epoch), "bottlenecks": [row, ...]}. Each row is a dict
+        with the "timeframe_id", what it "limits" ("start", "end" or "both"), the "dropped_window" (start_epoch,
+        end_epoch) without it, the "gain" in seconds, the "shift_start" and "shift_end" in seconds needed for the full
+        gain, and the "extension" (start_seconds, end_seconds) needed to reach the target duration, or None if
+        extending this timeframe alone cannot reach it. Rows are sorted by gain, largest first.
+    """
+
+    # Two latest start times and two earliest end times, counting equal times separately.
+    first_start = second_start = first_end = second_end = None
+
+    for timeframe in timeframes.values():
+        start, end = timeframe.norm_start_epoch, timeframe.norm_end_epoch
+
+        if first_start is None or start > first_start:
+            first_start, second_start = start, first_start
+        elif second_start is None or start > second_start:
+            second_start = start
+
+        if first_end is None or end < first_end:
+            first_end, second_end = end, first_end
+        elif second_end is None or end < second_end:
+            second_end = end
+
+    # Duration of the common timeframe, 0 if it does not exist.
+    duration = max(first_end - first_start, 0)
+
+    bottlenecks = []
+
+    for timeframe_id, timeframe in timeframes.items():
+        start, end = timeframe.norm_start_epoch, timeframe.norm_end_epoch
+
+        # Only the timeframes holding the latest start time or the earliest end time limit the common timeframe.
+        if start != first_start and end != first_end:
+            continue
+
+        # Common timeframe of the other timeframes.
+        dropped_start = second_start if start == first_start else first_start
+        dropped_end = second_end if end == first_end else first_end
+
+        # Room to move this timeframe's start earlier and its end later before another timeframe limits it.
+        shift_start = start - dropped_start
+        shift_end = dropped_end - end
+
+        # Smallest extension of this timeframe reaching the target, taken from the start first.
+        extension = None
+        if target_seconds is not None and dropped_end - dropped_start >= target_seconds:
+            needed = max(target_seconds - (first_end - first_start), 0)
+            from_start = min(needed, max(shift_start, 0))
+            extension = (from_start, needed - from_start)
+
+        bottlenecks.append({
+            "timeframe_id": timeframe_id,
+            "limits": "both" if start == first_start and end == first_end else
+                      "start" if start == first_start else "end",
+            "dropped_window": (dropped_start, dropped_end),
+            "gain": max(dropped_end - dropped_start, 0) - duration,
+            "shift_start": shift_start,
+            "shift_end": shift_end,
+            "extension": extension,
+        })
+
+    bottlenecks.sort(key=lambda row: row["gain"], reverse=True)
+
+    return {"window": (first_start, first_end), "bottlenecks": bottlenecks}
@@ -0,0 +1,48 @@
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+# The TimeSync modules import each other as top-level modules from the src directory.
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, SOURCE_DIR)
+
+# UTC offsets used by random records, including offsets that are not whole hours.
+UTC_OFFSETS = ["+00:00", "+01:00", "-03:00", "+05:30", "-09:30", "+12:45"]
+
+
+@pytest.fixture
+def rng(seed):
+    """ Random number generator seeded with the "seed" parameter of the test, so a failing seed can be replayed. """
+
+    return random.Random(seed)
+
+
+@pytest.fixture
+def random_records(rng):
+    """ Build random (utc_offset, start_time, end_time) records, with the times in the format of 'add'.
+
+    Returns:
+        a function called as random_records(count, days=3, step=15, max_length=36 * 60, zero_length_share=0):
+            count (int): number of records.
+            days (int): number of days after 01-01-30 00:00 that the start times are within.
+            step (int): the start times and lengths are multiples of step minutes.
+            max_length (int): maximum length of a record in minutes.
+            zero_length_share (float): share of the records that have zero length.
+    """
+
+    def build(count: int, days: int = 3, step: int = 15, max_length: int = 36 * 60,
+              zero_length_share: float = 0) -> list:
+        records = []
+        for _ in range(count):
+            start_time = datetime(2030, 1, 1) + timedelta(minutes=rng.randrange(0, days * 24 * 60, step))
+            length = 0 if rng.random() < zero_length_share else rng.randrange(0, max_length, step)
+            end_time = start_time + timedelta(minutes=length)
+            records.append((rng.choice(UTC_OFFSETS), start_time.strftime("%d-%m-%y %H:%M"),
+                            end_time.strftime("%d-%m-%y %H:%M")))
+
+        return records
+
+    return build
@@ -0,0 +1,247 @@
+"""
+Behavior checks of the live dashboard, run against the CLI in a pseudo-terminal.
+
+The terminal output is replayed on a minimal terminal model, so the checks see the screen as a user would.
+"""
+
+import os
+import re
+import select
+import subprocess
+import sys
+import time
+
+import pytest
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="the live dashboard requires a POSIX terminal")
+
+# Directory of the TimeSync sources.
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+
+# Size of the pseudo-terminal.
+COLUMNS, ROWS = 100, 24
+
+# Escape sequences handled by the terminal model: control sequences ("\033[...X") and other two-character escapes.
+CONTROL_SEQUENCE = re.compile(r"\033\[(\??)([\d;]*)([A-Za-z])|\033.")
+
+
+class Terminal:
+    """
+    Minimal model of a terminal: cursor movement, line clearing, the scroll region and the alternate screen.
+    """
+
+    def __init__(self, columns: int, rows: int) -> None:
+        self.columns, self.rows = columns, rows
+        self.reset()
+
+    def reset(self) -> None:
+        self.lines = [[" "] * self.columns for _ in range(self.rows)]
+        self.row = self.column = 0
+        self.top, self.bottom = 0, self.rows - 1
+
+    def screen(self) -> list:
+        """ Get the rows of the screen, without trailing spaces. """
+
+        return ["".join(line).rstrip() for line in self.lines]
+
+    def line_feed(self) -> None:
+        # Scroll the scroll region if the cursor is on its last row.
+        if self.row == self.bottom:
+            del self.lines[self.top]
+            self.lines.insert(self.bottom, [" "] * self.columns)
+        elif self.row < self.rows - 1:
+            self.row += 1
+
+    def feed(self, text: str) -> None:
+        index = 0
+
+        while index < len(text):
+            character = text[index]
+
+            if character == "\033":
+                match = CONTROL_SEQUENCE.match(text, index)
+                if match is None:
+                    break
+                index = match.end()
+                self.control(*match.groups())
+                continue
+
+            if character == "\r":
+                self.column = 0
+            elif character == "\n":
+                self.line_feed()
+            elif character == "\b":
+                self.column = max(self.column - 1, 0)
+            elif character >= " ":
+                if self.column >= self.columns:
+                    self.column = 0
+                    self.line_feed()
+                self.lines[self.row][self.column] = character
+                self.column += 1
+
+            index += 1
+
+    def control(self, private: str | None, parameters: str | None, final: str | None) -> None:
+        arguments = [int(argument) if argument else 0 for argument in parameters.split(";")] if parameters else []
+
+        if final == "H":
+            row, column = (arguments + [1, 1])[:2] if arguments else (1, 1)
+            self.row, self.column = max(row, 1) - 1, max(column, 1) - 1
+        elif final == "K":
+            self.lines[self.row][self.column:] = [" "] * (self.columns - self.column)
+        elif final == "J" and arguments == [2]:
+            self.lines = [[" "] * self.columns for _ in range(self.rows)]
+        elif final == "r":
+            top, bottom = arguments if len(arguments) == 2 else (1, self.rows)
+            self.top, self.bottom = top - 1, bottom - 1
+            self.row = self.column = 0
+        elif final in {"h", "l"} and private and 1049 in arguments:
+            self.reset()
+
+
+class Session:
+    """
+    The TimeSync CLI running in a pseudo-terminal.
+    """
+
+    def __init__(self) -> None:
+        import fcntl
+        import pty
+        import struct
+        import termios
+
+        self.master, slave = pty.openpty()
+        fcntl.ioctl(slave, termios.TIOCSWINSZ, struct.pack("HHHH", ROWS, COLUMNS, 0, 0))
+
+        environment = dict(os.environ, COLUMNS=str(COLUMNS), LINES=str(ROWS), TERM="xterm")
+        self.process = subprocess.Popen([sys.executable, "timesync.py"], cwd=SOURCE_DIR, stdin=slave, stdout=slave,
+                                        stderr=slave, env=environment, start_new_session=True)
+        os.close(slave)
+
+        self.terminal = Terminal(COLUMNS, ROWS)
+
+    def send(self, line: str) -> None:
+        os.write(self.master, line.encode() + b"\r")
+
+    def wait_for(self, condition, timeout: float = 10) -> list:
+        """ Read the output until the screen satisfies a condition.
+
+        Returns:
+            the rows of the screen.
+        """
+
+        deadline = time.monotonic() + timeout
+
+        while not condition(self.terminal.screen()):
+            remaining = deadline - time.monotonic()
+            assert remaining > 0, "timed out. Screen:\n" + "\n".join(self.terminal.screen())
+
+            readable, _, _ = select.select([self.master], [], [], remaining)
+            if readable:
+                try:
+                    self.terminal.feed(os.read(self.master, 65536).decode(errors="replace"))
+                except OSError:
+                    break
+
+        return self.terminal.screen()
+
+    def settle(self, duration: float = 0.5) -> list:
+        """ Read the output until nothing was written for a while.
+
+        Returns:
+            the rows of the screen.
+        """
+
+        while select.select([self.master], [], [], duration)[0]:
+            try:
+                self.terminal.feed(os.read(self.master, 65536).decode(errors="replace"))
+            except OSError:
+                break
+
+        return self.terminal.screen()
+
+    def close(self) -> None:
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        os.close(self.master)
+
+
+@pytest.fixture
+def session():
+    session = Session()
+    session.wait_for(lambda screen: any(row.startswith(">>") for row in screen))
+    yield session
+    session.close()
+
+
+def test_panes_stay_in_place_after_commands(session):
+    session.send("add a +00:00 01-01-30 10:00 01-01-30 12:00")
+    session.wait_for(lambda screen: any("Timeframe added." in row for row in screen))
+
+    session.send("live ls")
+    first_frame = session.wait_for(
+        lambda screen: screen[0] == "[ ls ]" and any(row.startswith("| a ") for row in screen)
+    )
+
+    session.send("add b +00:00 01-01-30 11:00 01-01-30 13:00")
+    screen = session.wait_for(lambda screen: any(row.startswith("| b ") for row in screen))
+    screen = session.settle()
+
+    # The panes did not scroll: the title and the table start on the same rows as before.
+    assert screen[0] == "[ ls ]"
+    assert screen[1:5] == first_frame[1:5]
+    assert screen[5].startswith("| b ")
+
+    # The status line shows the last output of the command, and the prompt is drawn again on the last row.
+    assert screen[ROWS - 2] == "Timeframe added."
+    assert screen[ROWS - 1] == ">>"
+
+    # A confirmation question is answered on the prompt row as well.
+    session.send("add a +01:00 01-01-30 10:00 01-01-30 12:00")
+    session.wait_for(lambda screen: "overwrite" in screen[ROWS - 2])
+    session.send("y")
+    screen = session.wait_for(lambda screen: any(row.startswith("| a            | +01:00") for row in screen))
+    screen = session.settle()
+
+    assert screen[0] == "[ ls ]"
+    assert screen[ROWS - 1] == ">>"
+
+
+def test_vis_pane_of_an_empty_session(session):
+    session.send("add a +00:00 01-01-30 10:00 01-01-30 12:00")
+    session.send("live vis")
+    session.wait_for(lambda screen: screen[0] == "[ vis ]")
+
+    # Removing every timeframe leaves nothing to visualize, which the pane shows instead of failing.
+    session.send("remove a")
+    screen = session.wait_for(lambda screen: any("No timeframes to visualize." in row for row in screen))
+
+    assert screen[0] == "[ vis ]"
+    assert session.process.poll() is None
+
+    session.send("exit")
+    session.wait_for(lambda screen: any("Left live mode." in row for row in screen))
+    session.send("exit")
+    assert session.process.wait(timeout=10) == 0
+
+
+def test_export_runs_once_instead_of_changing_a_pane(session, tmp_path):
+    path = tmp_path / "timeframes.jsonl"
+
+    session.send("add a +00:00 01-01-30 10:00 01-01-30 12:00")
+    session.send("live ls")
+    session.wait_for(lambda screen: screen[0] == "[ ls ]" and any(row.startswith("| a ") for row in screen))
+
+    session.send(f"ls --format jsonl --out {path}")
+    screen = session.wait_for(lambda screen: "Output written to" in screen[ROWS - 2])
+    assert path.exists()
+    assert screen[0] == "[ ls ]"
+
+    # Later frames show the table again, and do not write the file.
+    path.unlink()
+    session.send("add b +00:00 01-01-30 11:00 01-01-30 13:00")
+    session.wait_for(lambda screen: any(row.startswith("| b ") for row in screen))
+    session.settle()
+
+    assert not path.exists()
@@ -0,0 +1,189 @@
+"""
+Behavior checks of the external-memory sweep, against a brute-force count of the coverage of each minute.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import external
+from timeframe import TimeFrame
+
+
+def write_records(path, records: list) -> list:
+    """ Write (utc_offset, start_time, end_time) records to a JSON Lines file, as exported with 'ls --format jsonl'.
+
+    Returns:
+        the records as TimeFrame objects.
+    """
+
+    with open(path, "w") as file:
+        for index, (utc_offset, start_time, end_time) in enumerate(records):
+            record = {"timeframe_id": f"id-{index}", "utc_offset": utc_offset, "start_time": start_time,
+                      "end_time": end_time}
+            file.write(json.dumps(record) + "\n")
+
+    return [TimeFrame(*record) for record in records]
+
+
+def coverage_windows(coverage: list, first_minute: int, predicate) -> list:
+    """ Find the maximal runs of minutes whose coverage satisfies a predicate.
+
+    Returns:
+        the (start, end) normalized datetime objects of each run.
+    """
+
+    windows = []
+    start = None
+
+    for minute, count in enumerate(coverage + [None]):
+        if count is not None and predicate(count):
+            start = minute if start is None else start
+        elif start is not None:
+            windows.append(tuple(external.EPOCH + timedelta(minutes=first_minute + m) for m in (start, minute)))
+            start = None
+
+    return windows
+
+
+def brute_force_sweep(timeframes: list, quorum: int) -> dict:
+    """ Compute the statistics of sweep_file() by counting the timeframes covering each minute. """
+
+    first_minute = min(timeframe.norm_start_epoch for timeframe in timeframes) // 60
+    last_minute = max(timeframe.norm_end_epoch for timeframe in timeframes) // 60
+
+    coverage = [0] * (last_minute - first_minute)
+    for timeframe in timeframes:
+        for minute in range(timeframe.norm_start_epoch // 60, timeframe.norm_end_epoch // 60):
+            coverage[minute - first_minute] += 1
+
+    histogram = {}
+    for count in coverage:
+        histogram[count] = histogram.get(count, 0) + 60
+
+    quorum_windows = coverage_windows(coverage, first_minute, lambda count: count >= quorum)
+    common_windows = coverage_windows(coverage, first_minute, lambda count: count == len(timeframes))
+
+    return {
+        "records": len(timeframes),
+        "peak": max(coverage, default=0),
+        "common_window": common_windows[0] if common_windows else None,
+        "quorum": quorum,
+        "quorum_windows": len(quorum_windows),
+        # The sweep keeps the first of the longest windows.
+        "longest_quorum_window": max(quorum_windows, key=lambda window: window[1] - window[0], default=None),
+        "histogram": dict(sorted(histogram.items())),
+    }
+
+
+@pytest.fixture
+def many_runs(monkeypatch):
+    """ Shrink the runs and the merge fan-in so that a small file is sorted in many runs, merged in several passes.
+
+    Returns:
+        the list of the number of runs written by each sweep.
+    """
+
+    # A huge size per event makes every run and read block as short as allowed: 1024 events, or 512 records.
+    monkeypatch.setattr(external, "BYTES_PER_EVENT", 1 << 30)
+    monkeypatch.setattr(external, "MAX_MERGE_FAN_IN", 3)
+
+    run_counts = []
+    write_sorted_runs = external.write_sorted_runs
+
+    def counting_write_sorted_runs(*args, **kwargs):
+        run_paths, record_count = write_sorted_runs(*args, **kwargs)
+        run_counts.append(len(run_paths))
+        return run_paths, record_count
+
+    monkeypatch.setattr(external, "write_sorted_runs", counting_write_sorted_runs)
+    return run_counts
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_sweep_of_many_runs_matches_brute_force(tmp_path, many_runs, rng, random_records):
+    path = tmp_path / "timeframes.jsonl"
+    temp_dir = tmp_path / "runs"
+    temp_dir.mkdir()
+
+    # Half of the records have zero length, and cover no time.
+    timeframes = write_records(path, random_records(6000, days=2, step=1, max_length=12 * 60, zero_length_share=0.5))
+    quorum = rng.randint(50, 400)
+
+    statistics = external.sweep_file(str(path), quorum=quorum, memory_mb=1, temp_dir=str(temp_dir))
+
+    # The runs did not fit in one merge, so some were merged into intermediate runs first.
+    assert many_runs[0] > external.MAX_MERGE_FAN_IN ** 2
+    assert statistics == brute_force_sweep(timeframes, quorum)
+
+    # The runs are deleted after the sweep.
+    assert list(temp_dir.iterdir()) == []
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_sweep_of_shared_timeframes(tmp_path, many_runs, rng):
+    path = tmp_path / "timeframes.jsonl"
+
+    # Every timeframe covers the first hour of the year, so there is a common window.
+    records = []
+    for _ in range(2000):
+        start_time = datetime(2030, 1, 1) - timedelta(minutes=rng.randrange(0, 600))
+        end_time = datetime(2030, 1, 1, 1) + timedelta(minutes=rng.randrange(0, 600))
+        records.append(("+00:00", start_time.strftime("%d-%m-%y %H:%M"), end_time.strftime("%d-%m-%y %H:%M")))
+
+    timeframes = write_records(path, records)
+
+    statistics = external.sweep_file(str(path), memory_mb=1)
+
+    assert many_runs[0] > external.MAX_MERGE_FAN_IN
+    assert statistics == brute_force_sweep(timeframes, len(timeframes))
+    assert statistics["common_window"][0] <= datetime(2030, 1, 1)
+    assert statistics["common_window"][1] >= datetime(2030, 1, 1, 1)
+
+
+def test_sweep_of_an_empty_file(tmp_path):
+    path = tmp_path / "timeframes.jsonl"
+    path.write_text("\n")
+
+    statistics = external.sweep_file(str(path))
+
+    assert statistics["records"] == 0
+    assert statistics["peak"] == 0
+    assert statistics["histogram"] == {}
+    assert statistics["common_window"] is None
+
+
+def test_invalid_arguments_are_rejected(tmp_path):
+    path = tmp_path / "timeframes.jsonl"
+    path.write_text("")
+
+    with pytest.raises(ValueError):
+        external.sweep_file(str(path), memory_mb=0)
+
+    with pytest.raises(ValueError):
+        external.sweep_file(str(path), quorum=0)
+
+
+@pytest.mark.parametrize("line", [
+    "[1, 2]",
+    "{\"timeframe_id\": \"b\", \"utc_offset\": \"+00:00\", \"start_time\": 5, \"end_time\": \"01-01-30 12:00\"}",
+    "{\"timeframe_id\": \"b\", \"utc_offset\": \"+01:15\", \"start_time\": \"01-01-30 10:00\", "
+    "\"end_time\": \"01-01-30 12:00\"}",
+    "{\"utc_offset\": \"+00:00\", \"start_time\": \"01-01-30 10:00\", \"end_time\": \"01-01-30 12:00\"}",
+    "{\"timeframe_id\": \"b\", \"utc_offset\": \"+00:00\"",
+])
+def test_malformed_line_is_rejected(tmp_path, line):
+    path = tmp_path / "timeframes.jsonl"
+    temp_dir = tmp_path / "runs"
+    temp_dir.mkdir()
+
+    valid_line = json.dumps({"timeframe_id": "a", "utc_offset": "+00:00", "start_time": "01-01-30 10:00",
+                             "end_time": "01-01-30 12:00"})
+    path.write_text(f"{valid_line}\n\n{line}\n")
+
+    # The error names the line of the record, and the runs written so far are deleted.
+    with pytest.raises(ValueError, match="record 3"):
+        external.sweep_file(str(path), temp_dir=str(temp_dir))
+
+    assert list(temp_dir.iterdir()) == []
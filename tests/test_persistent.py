@@ -0,0 +1,121 @@
+"""
+Behavior checks of the persistent treap, against a dict model of every version.
+"""
+
+import random
+
+import pytest
+
+from persistent import PersistentMap, assoc, diff, dissoc, iterate, lookup, size
+
+
+def check_invariants(node) -> None:
+    """ Check the search tree order of the keys, the heap order of the priorities and the subtree sizes. """
+
+    def visit(node, low, high) -> int:
+        if node is None:
+            return 0
+
+        assert (low is None or low < node.key) and (high is None or node.key < high)
+        for child in (node.left, node.right):
+            assert child is None or child.priority <= node.priority
+
+        count = 1 + visit(node.left, low, node.key) + visit(node.right, node.key, high)
+        assert node.size == count
+        return count
+
+    visit(node, None, None)
+
+
+def expected_diff(old: dict, new: dict) -> list:
+    """ Build the expected diff of two versions of the model: keys whose values are not the same object. """
+
+    return [
+        (key, old.get(key), new.get(key))
+        for key in sorted(old.keys() | new.keys())
+        if old.get(key) is not new.get(key)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_versions_match_dict_model(seed):
+    rng = random.Random(seed)
+    keys = [f"id-{index}" for index in range(rng.choice([5, 40, 300]))]
+
+    root, model = None, {}
+    versions = [(root, dict(model))]
+
+    for _ in range(600):
+        key = rng.choice(keys)
+
+        if rng.random() < 0.6:
+            value = object()
+            root = assoc(root, key, value)
+            model[key] = value
+        else:
+            root = dissoc(root, key)
+            model.pop(key, None)
+
+        versions.append((root, dict(model)))
+
+    # Every version, including the old ones, still holds exactly its own keys and values.
+    for root, model in versions[::7] + versions[-1:]:
+        check_invariants(root)
+        assert list(iterate(root)) == sorted(model.items())
+        assert size(root) == len(model)
+        for key in keys:
+            assert lookup(root, key, "missing") is model.get(key, "missing")
+
+    # The diff of any two versions lists exactly the changed keys, in order of key.
+    for _ in range(50):
+        (old_root, old_model), (new_root, new_model) = rng.sample(versions, 2)
+        assert list(diff(old_root, new_root)) == expected_diff(old_model, new_model)
+
+
+def test_diff_skips_shared_subtrees():
+    root = None
+    for index in range(1000):
+        root = assoc(root, f"id-{index:04}", index)
+
+    assert list(diff(root, root)) == []
+
+    # A single change copies only the path to the key, so the versions share every other node.
+    changed = assoc(root, "id-0500", "changed")
+    assert list(diff(root, changed)) == [("id-0500", 500, "changed")]
+
+    removed = dissoc(changed, "id-0001")
+    assert list(diff(changed, removed)) == [("id-0001", 1, None)]
+    assert list(diff(removed, changed)) == [("id-0001", None, 1)]
+
+
+def test_dissoc_of_missing_key_keeps_the_version():
+    root = assoc(assoc(None, "a", 1), "b", 2)
+    assert dissoc(root, "c") is root
+    assert dissoc(None, "a") is None
+
+
+def test_assoc_replaces_value():
+    root = assoc(assoc(None, "a", 1), "a", 2)
+    assert list(iterate(root)) == [("a", 2)]
+    assert size(root) == 1
+
+
+def test_persistent_map():
+    root = None
+    for key, value in [("b", 2), ("a", 1), ("c", None)]:
+        root = assoc(root, key, value)
+
+    snapshot = PersistentMap(root)
+    later = PersistentMap(dissoc(root, "a"))
+
+    assert list(snapshot) == ["a", "b", "c"]
+    assert len(snapshot) == 3
+    assert snapshot["c"] is None
+    assert "c" in snapshot and "d" not in snapshot and 1 not in snapshot
+    assert dict(snapshot.items()) == {"a": 1, "b": 2, "c": None}
+
+    with pytest.raises(KeyError):
+        snapshot["d"]
+
+    # Later versions do not affect the snapshot.
+    assert "a" in snapshot and "a" not in later
@@ -0,0 +1,184 @@
+"""
+Behavior checks of the shared session, read from a separate process while the writer goes through each kind of update.
+"""
+
+import json
+import os
+import random
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from shared import MAX_NAME_LENGTH, SharedSessionWriter
+from timeframe import TimeFrame
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="the shared session is checked with POSIX shared memory")
+
+# Directory of the TimeSync sources.
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+
+# Reader process. Answers one JSON query per line: ["common"] or ["who", "<ISO time>"].
+READER_SCRIPT = """
+import json, sys
+from datetime import datetime
+from shared import SharedSessionReader
+
+reader = SharedSessionReader(sys.argv[1])
+for line in sys.stdin:
+    query = json.loads(line)
+    if query[0] == "common":
+        window = reader.common_timeframe()
+        answer = None if window is None else [time.isoformat() for time in window]
+    else:
+        answer = sorted(reader.who(datetime.fromisoformat(query[1])))
+    print(json.dumps(answer), flush=True)
+reader.close()
+"""
+
+
+class Reader:
+    """
+    A SharedSessionReader running in a separate process.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.process = subprocess.Popen([sys.executable, "-c", READER_SCRIPT, name], cwd=SOURCE_DIR,
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+
+    def ask(self, *query):
+        self.process.stdin.write(json.dumps(query) + "\n")
+        self.process.stdin.flush()
+        return json.loads(self.process.stdout.readline())
+
+    def close(self) -> None:
+        self.process.stdin.close()
+        assert self.process.wait(timeout=10) == 0
+
+
+def random_timeframe(rng: random.Random) -> TimeFrame:
+    """ Build a random timeframe within a few days of 01-01-30 12:00 local time. """
+
+    start_time = datetime(2030, 1, 1, 12) - timedelta(minutes=rng.randrange(0, 3 * 24 * 60, 30))
+    end_time = datetime(2030, 1, 1, 12) + timedelta(minutes=rng.randrange(-12 * 60, 3 * 24 * 60, 30))
+    return TimeFrame(rng.choice(["+00:00", "+02:00", "-05:00"]), start_time.strftime("%d-%m-%y %H:%M"),
+                     max(start_time, end_time).strftime("%d-%m-%y %H:%M"))
+
+
+def check_reader(reader: Reader, timeframes: dict) -> None:
+    """ Check the answers of the reader process against the timeframes of the writer. """
+
+    if timeframes:
+        start_time = max(timeframe.norm_start_time for timeframe in timeframes.values())
+        end_time = min(timeframe.norm_end_time for timeframe in timeframes.values())
+    expected = [start_time.isoformat(), end_time.isoformat()] if timeframes and start_time < end_time else None
+    assert reader.ask("common") == expected
+
+    # Check the start and end time of every timeframe, where the answer changes.
+    time_points = {time for timeframe in timeframes.values()
+                   for time in (timeframe.norm_start_time, timeframe.norm_end_time)}
+    for time_point in sorted(time_points)[::max(1, len(time_points) // 40)]:
+        expected = sorted(timeframe_id for timeframe_id, timeframe in timeframes.items()
+                          if timeframe.norm_start_time <= time_point < timeframe.norm_end_time)
+        assert reader.ask("who", time_point.isoformat()) == expected
+
+
+@pytest.fixture
+def writer():
+    writer = SharedSessionWriter(f"timesync-test-{os.getpid()}", capacity=8)
+    yield writer
+    writer.close()
+
+
+def test_reader_follows_every_kind_of_update(writer):
+    rng = random.Random(0)
+    timeframes = {}
+    reader = Reader(writer.name)
+
+    try:
+        check_reader(reader, timeframes)
+
+        # Add: the data block grows from 8 slots as the timeframes are added.
+        for index in range(100):
+            timeframe_id = f"id-{index}"
+            timeframes[timeframe_id] = random_timeframe(rng)
+            writer.set(timeframe_id, timeframes[timeframe_id])
+
+        assert writer.capacity >= 100 and writer.block_count > 1
+        check_reader(reader, timeframes)
+
+        # Overwrite: replaced timeframes keep their slots.
+        block_count = writer.block_count
+        for timeframe_id in rng.sample(sorted(timeframes), 40):
+            timeframes[timeframe_id] = random_timeframe(rng)
+            writer.set(timeframe_id, timeframes[timeframe_id])
+
+        assert writer.block_count == block_count
+        check_reader(reader, timeframes)
+
+        # Remove: the last slot is moved into each removed slot.
+        for timeframe_id in rng.sample(sorted(timeframes), 90):
+            del timeframes[timeframe_id]
+            writer.remove(timeframe_id)
+
+        check_reader(reader, timeframes)
+
+        # Churn: the bytes of removed IDs are reclaimed in place, without a new data block.
+        reclaimed = False
+        for index in range(2000):
+            timeframe_id = f"churn-{index}"
+            id_bytes_used = writer.id_bytes_used
+
+            timeframes[timeframe_id] = random_timeframe(rng)
+            writer.set(timeframe_id, timeframes[timeframe_id])
+            reclaimed |= writer.id_bytes_used < id_bytes_used
+
+            removed_id = rng.choice(sorted(timeframes))
+            del timeframes[removed_id]
+            writer.remove(removed_id)
+
+            if index % 500 == 0:
+                check_reader(reader, timeframes)
+
+        assert reclaimed and writer.block_count == block_count
+        check_reader(reader, timeframes)
+
+        # Grow: long IDs fill the ID column, then the slots, so the reader moves to new data blocks.
+        for index in range(3000):
+            timeframe_id = f"grow-{index}-" + "x" * rng.randrange(0, 60)
+            timeframes[timeframe_id] = random_timeframe(rng)
+            writer.set(timeframe_id, timeframes[timeframe_id])
+
+        assert writer.block_count > block_count
+        check_reader(reader, timeframes)
+
+        # Publish replaces every timeframe, and clear removes them.
+        timeframes = {f"new-{index}": random_timeframe(rng) for index in range(50)}
+        writer.publish(timeframes)
+        check_reader(reader, timeframes)
+
+        writer.clear()
+        check_reader(reader, {})
+    finally:
+        reader.close()
+
+
+def test_common_timeframe_of_overlapping_timeframes(writer):
+    reader = Reader(writer.name)
+
+    try:
+        writer.set("a", TimeFrame("+00:00", "01-01-30 10:00", "01-01-30 14:00"))
+        writer.set("b", TimeFrame("+02:00", "01-01-30 13:00", "01-01-30 18:00"))
+        assert reader.ask("common") == ["2030-01-01T11:00:00", "2030-01-01T14:00:00"]
+        assert reader.ask("who", "2030-01-01T10:30:00") == ["a"]
+
+        writer.set("c", TimeFrame("+00:00", "02-01-30 10:00", "02-01-30 14:00"))
+        assert reader.ask("common") is None
+    finally:
+        reader.close()
+
+
+def test_long_name_is_rejected():
+    with pytest.raises(ValueError):
+        SharedSessionWriter("x" * (MAX_NAME_LENGTH + 1))
@@ -0,0 +1,88 @@
+"""
+Behavior checks of the single-pass common timeframe API, against a brute-force search over subsets of the records.
+"""
+
+from datetime import datetime, timedelta
+from itertools import combinations
+
+import pytest
+
+from stream import quorum_stream, stream_common_timeframe
+from timeframe import TimeFrame
+
+
+def brute_force_duration(records: list, allow_absent: int) -> timedelta | None:
+    """ Find the duration of the longest timeframe shared by all but at most allow_absent records, trying every
+    subset of records to leave out. """
+
+    timeframes = [TimeFrame(*record) for record in records]
+    best_duration = None
+
+    for absent_count in range(min(allow_absent, len(timeframes) - 1) + 1):
+        for absent in combinations(range(len(timeframes)), absent_count):
+            remaining = [timeframe for index, timeframe in enumerate(timeframes) if index not in absent]
+            start_time = max(timeframe.norm_start_time for timeframe in remaining)
+            end_time = min(timeframe.norm_end_time for timeframe in remaining)
+
+            if start_time < end_time and (best_duration is None or end_time - start_time > best_duration):
+                best_duration = end_time - start_time
+
+    return best_duration
+
+
+def shared_by(records: list, window: tuple) -> int:
+    """ Count the records whose normalized times cover a window. """
+
+    timeframes = [TimeFrame(*record) for record in records]
+    return sum(timeframe.norm_start_time <= window[0] and window[1] <= timeframe.norm_end_time
+               for timeframe in timeframes)
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_quorum_stream_matches_brute_force(rng, random_records):
+    records = random_records(rng.randint(1, 8))
+    allow_absent = rng.randint(1, 4)
+
+    window = quorum_stream(iter(records), allow_absent)
+    expected_duration = brute_force_duration(records, allow_absent)
+
+    if expected_duration is None:
+        assert window is None
+        return
+
+    # The window is as long as the best one, and is shared by all but at most allow_absent records.
+    assert window[1] - window[0] == expected_duration
+    assert shared_by(records, window) >= len(records) - allow_absent
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_common_timeframe_without_absent_records(rng, random_records):
+    records = random_records(rng.randint(1, 8))
+
+    window = stream_common_timeframe(iter(records))
+    expected_duration = brute_force_duration(records, 0)
+
+    if expected_duration is None:
+        assert window is None
+    else:
+        assert window[1] - window[0] == expected_duration
+        assert shared_by(records, window) == len(records)
+
+
+def test_no_records():
+    assert quorum_stream(iter([]), 2) is None
+    assert stream_common_timeframe(iter([]), allow_absent=2) is None
+
+
+def test_relaxed_offsets_are_normalized():
+    # "+6" is formatted as "+06:00" before the record is normalized.
+    window = stream_common_timeframe([("+6", "01-01-30 10:00", "01-01-30 12:00")])
+    assert window == (datetime(2030, 1, 1, 4), datetime(2030, 1, 1, 6))
+
+
+def test_invalid_offset_is_rejected():
+    with pytest.raises(ValueError):
+        stream_common_timeframe([("+01:15", "01-01-30 10:00", "01-01-30 12:00")])
+
+    with pytest.raises(ValueError):
+        stream_common_timeframe([("+00:00", "01-01-30 10:00", "01-01-30 12:00")], allow_absent=-1)